@@ -18,11 +18,13 @@
 from __future__ import absolute_import, unicode_literals, print_function
 
 import re
+import functools
 
 import click
 from bunch import Bunch
 
 from . import config
+from .util import dclick
 
 
 # Default name of the app, and its app directory
@@ -63,19 +65,69 @@ def license_option(*param_decls, **attrs):
 
 
 # Main command (root)
-@click.group(context_settings=CONTEXT_SETTINGS)
+@click.group(cls=dclick.LazyGroup, context_settings=CONTEXT_SETTINGS)
 @click.version_option(message=config.VERSION_INFO)
 @license_option()
 @click.option('-q', '--quiet', is_flag=True, default=False, help='Be quiet (show only errors).')
 @click.option('-v', '--verbose', is_flag=True, default=False, help='Create extra verbose output.')
 @click.option('-c', '--config', "config_paths", metavar='FILE',
               multiple=True, type=click.Path(), help='Load given configuration file(s).')
+@click.option('--no-cache', is_flag=True, default=False, help='Do not use the persistent HTTP cache.')
+@click.option('--cache-ttl', metavar='SECONDS', type=click.IntRange(0), default=0,
+              help='Use cached responses younger than this without revalidation.')
+@click.option('--engine', type=click.Choice(['threads', 'asyncio']), default='threads',
+              help='Client engine for concurrent API calls.')
+@click.option('--retries', metavar='N', type=click.IntRange(1), default=5,
+              help='Attempts per API call on rate limits and transient failures.')
+@click.option('--profile', is_flag=True, default=False,
+              help='Print statistics of all API calls at exit.')
+@click.option('--profile-json', metavar='FILE', default=None,
+              help='Write statistics of all API calls as JSON to FILE at exit.')
 @click.pass_context
-def cli(ctx, quiet=False, verbose=False, config_paths=None):  # pylint: disable=unused-argument
+def cli(ctx, quiet=False, verbose=False, config_paths=None,
+        no_cache=False, cache_ttl=0, engine='threads', retries=5,
+        profile=False, profile_json=None):  # pylint: disable=unused-argument
     """GitHub Commander command line tool."""
+    from . import github
+
     config.Configuration.from_context(ctx, config_paths)
     ctx.obj.quiet = quiet
     ctx.obj.verbose = verbose
+    github.GitHubConfig.CACHE_ENABLED = not no_cache
+    github.GitHubConfig.CACHE_TTL = cache_ttl
+    github.GitHubConfig.VERBOSE = verbose
+    github.GitHubConfig.ENGINE = engine
+    github.GitHubConfig.RETRY_ATTEMPTS = retries
+    github.GitHubConfig.PROFILE = None
+    if profile or profile_json:
+        from .util import profiling
+
+        github.GitHubConfig.PROFILE = profiling.RequestProfile()
+        ctx.call_on_close(functools.partial(report_profile, github.GitHubConfig.PROFILE, profile_json))
+    github.GitHubConfig.RETRY_COUNTS.clear()
+    if verbose:
+        ctx.call_on_close(functools.partial(report_retries, github.GitHubConfig.PROFILE))
+
+
+def report_profile(recorder, json_file=None):
+    """Print the profile of API calls to stderr, or write it to ``json_file``."""
+    if json_file:
+        try:
+            recorder.dump(json_file)
+        except EnvironmentError as cause:
+            click.secho('ERR  Cannot write profile to "{}" ({})'.format(json_file, cause), fg='red', err=True)
+    else:
+        for line in recorder.report():
+            click.secho(line, fg='cyan', err=True)
+
+
+def report_retries(profile=None):
+    """Print a summary of the retried API calls to stderr, if there were any."""
+    from . import github
+
+    counts = profile.retries if profile else github.GitHubConfig.RETRY_COUNTS
+    if counts:
+        click.secho(github.describe_retries(counts), fg='cyan', err=True)
 
 
 # Import sub-commands to define them AFTER `cli` is defined
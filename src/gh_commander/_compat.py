@@ -152,3 +152,8 @@ try:
     from urllib.parse import urlparse
 except ImportError:
     from urlparse import urlparse
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
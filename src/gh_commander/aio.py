@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+""" Asyncio client engine.
+
+    This needs Python 3.5+ and the ``aiohttp`` package, and is only
+    imported when the ``asyncio`` engine is selected – see ``github.aio_map``.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import json
+import time
+import asyncio
+from collections import namedtuple
+
+import aiohttp
+
+from ._compat import urlparse, url_quote, string_types
+from .github import rate_limit_scheduler, retry_policy, page_urls
+
+
+Label = namedtuple('Label', 'name color')
+ResponseInfo = namedtuple('ResponseInfo', 'status_code headers content')  # as read by 'RateLimitScheduler.update'
+
+
+class APIError(Exception):
+    """Unexpected HTTP status of an API call, or a response that is no JSON."""
+
+    def __init__(self, status, data):
+        self.status = status
+        if isinstance(data, dict):
+            self.msg = data.get('message', '')
+        elif isinstance(data, string_types):
+            self.msg = ' '.join(data.split())[:100]  # e.g. the HTML page of a gateway error
+        else:
+            self.msg = ''
+        Exception.__init__(self, 'Status {} "{}"'.format(status, self.msg))
+
+
+def api_base_url(cfg):
+    """Return the REST API base URL for a ``GitHubConfig``, without any credentials."""
+    if not cfg.base_url:
+        return cfg.DEFAULT_URL
+    url = urlparse(cfg.base_url)
+    netloc = url.hostname + (':{}'.format(url.port) if url.port else '')
+    return '{}://{}{}/api/v3'.format(url.scheme, netloc, url.path.rstrip('/'))
+
+
+def decode(status, text):
+    """ Return the JSON data of a response body, or ``None`` if it is empty.
+
+        Error responses that are no JSON (like a proxy's HTML page) are
+        returned as text, while successful ones raise an ``APIError``.
+    """
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        if 200 <= status < 300:
+            raise APIError(status, text)
+        return text
+
+
+class AsyncGitHub(object):
+    """ Minimal asynchronous GitHub REST client, for use with ``async with``.
+
+        At most ``limit`` requests are in flight at any time, and all
+        of them are paced by one scheduler, see ``RateLimitScheduler``.
+    """
+
+    def __init__(self, cfg, limit=100):
+        self.cfg = cfg
+        self.base_url = api_base_url(cfg)
+        self.limit = limit
+        self.retry = retry_policy(cfg)
+        self.scheduler = rate_limit_scheduler(cfg)
+        self.profile = getattr(cfg, 'PROFILE', None)
+        self.session = None
+        self.semaphore = None
+
+    async def __aenter__(self):
+        headers = {'Accept': 'application/vnd.github.v3+json', 'User-Agent': 'gh-commander'}
+        auth = None
+        if self.cfg.password == 'token':
+            headers['Authorization'] = 'token ' + self.cfg.login_or_token
+        else:
+            auth = aiohttp.BasicAuth(self.cfg.login_or_token, self.cfg.password)
+
+        self.semaphore = asyncio.Semaphore(self.limit)
+        self.session = aiohttp.ClientSession(
+            headers=headers, auth=auth,
+            connector=aiohttp.TCPConnector(limit=self.limit),
+            timeout=aiohttp.ClientTimeout(total=self.cfg.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def rate_limit_delay(self, status, headers, text):
+        """Return the seconds to wait before retrying a rate limited request, or ``None``."""
+        return self.scheduler.update(ResponseInfo(status, headers, text.encode('utf-8')))
+
+    async def acquire(self):
+        """Wait until the next request may be sent, without blocking other coroutines."""
+        wait = self.scheduler.reserve_slot()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.scheduler.paused_until - time.time()  # another response may have paused all requests
+
+    async def request(self, method, url, payload=None):
+        """Perform an API call, and return its status, JSON data (see ``decode``), and links."""
+        if not url.startswith(('http://', 'https://')):
+            url = self.base_url + url
+        body = json.dumps(payload) if payload is not None else None
+        started = time.time()
+        for attempt in range(1, self.retry.attempts + 1):
+            try:
+                async with self.semaphore:
+                    await self.acquire()
+                    async with self.session.request(method, url, json=payload) as response:
+                        text = await response.text()
+                        delay = self.rate_limit_delay(response.status, response.headers, text)
+                        if delay is None:
+                            delay = self.retry.delay(attempt, method, url, status=response.status, body=body,
+                                                     retry_after=response.headers.get('Retry-After'))
+                        elif attempt == self.retry.attempts:
+                            delay = None
+                        if delay is None:
+                            if self.profile:
+                                self.profile.record(method, url, response.status, time.time() - started,
+                                                    sent=len(body or ''), received=len(text.encode('utf-8')),
+                                                    headers=response.headers)
+                            result = response.status, decode(response.status, text), response.links
+                            break
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as cause:
+                delay = self.retry.delay(attempt, method, url, error=cause, body=body,
+                                         unsent=isinstance(cause, aiohttp.ClientConnectorError))
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+        if attempt > 1 and result[0] == 422 and self.retry.creates_label(method, url):
+            result = await self.recover_created_label(url, payload, result)
+        return result
+
+    async def recover_created_label(self, url, payload, result):
+        """ Handle a repeated label creation, where an earlier attempt actually succeeded.
+
+            Like ``SchedulingAdapter.recover_created_label``, the label is
+            read back, and returned as if it was just created.
+        """
+        errors = (result[1].get('errors') or []) if isinstance(result[1], dict) else []
+        if not any(isinstance(i, dict) and i.get('code') == 'already_exists' for i in errors):
+            return result
+        status, data, links = await self.request('GET', '{}/{}'.format(
+                                                 url.rstrip('/'), url_quote(payload['name'].encode('utf-8'), safe='')))
+        return (201, data, links) if status == 200 else result
+
+    async def paginate(self, url):
+        """ Return all items of a listing, or ``None`` if it does not exist.
+
+            When the first page links to the ``last`` one, the other pages are requested concurrently.
+        """
+        status, items, links = await self.request('GET', url)
+        if status == 404:
+            return None
+        if status != 200:
+            raise APIError(status, items)
+        if 'last' in links:
+            for data in await asyncio.gather(*[self.page(str(i)) for i in page_urls(str(links['last']['url']))]):
+                items.extend(data)
+            return items
+
+        while 'next' in links:
+            status, data, links = await self.request('GET', str(links['next']['url']))
+            if status != 200:
+                raise APIError(status, data)
+            items.extend(data)
+        return items
+
+    async def page(self, url):
+        """Return the items of one page of a listing."""
+        status, data, _ = await self.request('GET', url)
+        if status != 200:
+            raise APIError(status, data)
+        return data
+
+    async def labels(self, owner, repo):
+        """Return the labels of a repository, or ``None`` if it does not exist."""
+        items = await self.paginate('/repos/{}/{}/labels?per_page=100'.format(owner, repo))
+        return None if items is None else [Label(i['name'], i['color']) for i in items]
+
+    async def write_label(self, owner, repo, existing, name, color):
+        """Update the ``existing`` label, or create a new one if that is ``None``; return success."""
+        payload = dict(name=name, color=color)
+        if existing is None:
+            status, _, _ = await self.request('POST', '/repos/{}/{}/labels'.format(owner, repo), payload)
+            return status == 201
+        status, _, _ = await self.request('PATCH', '/repos/{}/{}/labels/{}'.format(
+                                          owner, repo, url_quote(existing.encode('utf-8'), safe='')), payload)
+        return status == 200
+
+    async def delete_label(self, owner, repo, name):
+        """Delete an existing label; return success."""
+        status, _, _ = await self.request('DELETE', '/repos/{}/{}/labels/{}'.format(
+                                          owner, repo, url_quote(name.encode('utf-8'), safe='')))
+        return status in (204, 404)  # 404: a retried call already deleted it
+
+    async def user(self, login):
+        """Return a user's data as a dict, or ``None`` if there's no such user."""
+        status, data, _ = await self.request('GET', '/users/{}'.format(login))
+        if status == 404:
+            return None
+        if status != 200:
+            raise APIError(status, data)
+        return data
+
+
+def run(cfg, func, items, limit=100):
+    """Run ``func(client, item)`` coroutines for all ``items``, and return their results in order."""
+    async def main():
+        "Helper"
+        async with AsyncGitHub(cfg, limit=limit) as client:
+            return await asyncio.gather(*[func(client, item) for item in items])
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
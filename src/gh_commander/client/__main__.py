@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+""" Command line client of the "gh" daemon.
+
+    It forwards its arguments to a running ``gh daemon``, and only imports
+    the standard library for that. Without a daemon, the command runs in
+    this process, just like with ``gh``.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import sys
+
+from gh_commander import daemon
+
+
+# Name of the client command
+__app_name__ = 'gh-client'
+
+
+def cli():
+    """Run the command line in the daemon, or locally if none is running."""
+    code = daemon.forward(sys.argv[1:])
+    if code is None:
+        from gh_commander.__main__ import cli as local_cli
+
+        local_cli(prog_name='gh')  # pylint: disable=no-value-for-parameter,unexpected-keyword-arg
+    sys.exit(code)
+
+
+if __name__ == "__main__":  # imported via "python -m"?
+    cli()
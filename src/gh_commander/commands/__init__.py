@@ -17,7 +17,11 @@
 # limitations under the License.
 from __future__ import absolute_import, unicode_literals, print_function
 
-# Load the command modules for registration
-from . import help  # noqa pylint: disable=redefined-builtin
-from . import user  # noqa
-from . import label  # noqa
+# Register the command modules, they are only imported when needed
+from .. import config
+
+config.cli.add_lazy_command('help', __name__ + '.help', 'Print some information on the system environment.')
+config.cli.add_lazy_command('user', __name__ + '.user', 'Managing user accounts.')
+config.cli.add_lazy_command('label', __name__ + '.label', 'Managing issue labels.')
+config.cli.add_lazy_command('batch', __name__ + '.batch', 'Running many commands in one process.')
+config.cli.add_lazy_command('daemon', __name__ + '.daemon', 'Running commands in a warm background process.')
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation, too-few-public-methods
+""" 'batch' command.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import io
+import sys
+import shlex
+import threading
+from contextlib import closing
+
+import click
+
+from .. import config
+from .._compat import PY2
+from ..util import dclick, parallel
+
+
+def read_script(infile):
+    """ Return the command lines in ``infile`` as a list of ``(line number, argv)`` tuples.
+
+        Empty lines and ``#`` comments are ignored, and a leading ``gh`` is optional.
+    """
+    try:
+        lines = infile.read().splitlines()
+    except EnvironmentError as cause:
+        raise dclick.LoggedFailure('Error while reading "{}" ({})'.format(getattr(infile, 'name', '<stream>'), cause))
+
+    commands = []
+    for number, line in enumerate(lines, 1):
+        try:
+            argv = shlex.split(line, comments=True)
+        except ValueError as cause:
+            raise dclick.LoggedFailure('Bad command in line {} ({})'.format(number, cause))
+        if argv and argv[0] == config.APP_NAME:
+            argv = argv[1:]
+        if argv:
+            commands.append((number, argv))
+    return commands
+
+
+class ThreadLocalStream(object):
+    """ Stand-in for ``sys.stdout`` or ``sys.stderr``, that keeps the output of
+        threads calling ``capture`` apart.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(getattr(self.local, 'target', None) or self.stream, name)
+
+    def capture(self):
+        """Collect the output of this thread, until ``release`` returns it."""
+        buf = io.BytesIO()
+        buf.isatty = self.stream.isatty
+        self.local.buf = buf
+        self.local.target = buf if PY2 else io.TextIOWrapper(buf, encoding='utf-8', write_through=True)
+
+    def release(self):
+        """Return the output of this thread since ``capture``, as bytes."""
+        if not PY2:
+            self.local.target.flush()
+        data = self.local.buf.getvalue()
+        self.local.target = self.local.buf = None
+        return data
+
+
+def run_command(ctx, argv):
+    """Run a sub-command of the root context ``ctx``, and return its exit code."""
+    try:
+        cmd_name, cmd, args = ctx.command.resolve_command(ctx, argv)
+        if cmd_name == 'batch':
+            raise dclick.LoggedFailure('Batches cannot be nested!')
+        with cmd.make_context(cmd_name, args, parent=ctx) as sub_ctx:
+            cmd.invoke(sub_ctx)
+    except click.ClickException as cause:
+        cause.show()
+        return cause.exit_code
+    except click.Abort:
+        click.echo('Aborted!', err=True)
+        return 1
+    except SystemExit as cause:
+        return cause.code if isinstance(cause.code, int) else int(cause.code is not None)
+    return 0
+
+
+@config.cli.command(name='batch')
+@click.option('-k', '--keep-going', is_flag=True, default=False, help='Continue after a failed command.')
+@click.option('-P', '--parallel', 'workers', metavar='N', type=click.IntRange(1), default=1,
+              help='Run up to N commands concurrently; they must not depend on each other.')
+@click.argument('script', metavar='FILE', type=click.File('r'), default='-')
+@click.pass_context
+def batch(ctx, script, keep_going=False, workers=1):
+    """ Run the commands in FILE (or stdin), one per line, in this process.
+
+        All commands share the API connections, the HTTP cache, and the
+        rate limit state, and use the global options given before 'batch'.
+    """
+    commands = read_script(script)
+    root = ctx.find_root()
+    failed = 0
+
+    if workers == 1:
+        for number, argv in commands:
+            if run_command(root, argv):
+                failed += 1
+                click.secho('ERR  Line {} failed: {}'.format(number, ' '.join(argv)), fg='red', err=True)
+                if not keep_going:
+                    break
+    else:
+        # Collect the output of each command, and print it in script order
+        stdout, stderr = ThreadLocalStream(sys.stdout), ThreadLocalStream(sys.stderr)
+
+        def execute(command):
+            "Helper"
+            stdout.capture()
+            stderr.capture()
+            try:
+                code = run_command(root, command[1])
+            finally:
+                output = stdout.release(), stderr.release()
+            return command, code, output
+
+        sys.stdout, sys.stderr = stdout, stderr
+        try:
+            with closing(parallel.ordered_map(execute, commands, workers)) as results:
+                for (number, argv), code, output in results:
+                    for stream, data in zip((stdout.stream, stderr.stream), output):
+                        if data:
+                            stream.flush()
+                            getattr(stream, 'buffer', stream).write(data)
+                            stream.flush()
+                    if code:
+                        failed += 1
+                        click.secho('ERR  Line {} failed: {}'.format(number, ' '.join(argv)), fg='red', err=True)
+                        if not keep_going:
+                            break  # queued commands are cancelled, running ones finish with their output dropped
+        finally:
+            sys.stdout, sys.stderr = stdout.stream, stderr.stream
+
+    if failed:
+        raise dclick.LoggedFailure('{} of {} command(s) failed.'.format(failed, len(commands)))
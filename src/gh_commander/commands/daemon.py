@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation, too-few-public-methods
+""" 'daemon' command.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import os
+import time
+import errno
+import socket
+
+import click
+
+from .. import config, daemon as server
+from ..util import dclick
+
+
+def socket_option():
+    """``--socket`` option, for a non-default location of the daemon's socket."""
+    return click.option('--socket', 'socket_path', metavar='PATH', default=None,
+                        help='Socket of the daemon [default: $GH_DAEMON_SOCKET, or in $XDG_RUNTIME_DIR].')
+
+
+def detach():
+    """Turn this (forked) process into a daemon, without a controlling terminal."""
+    os.setsid()
+    os.chdir('/')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fileno in range(3):
+        os.dup2(devnull, fileno)
+    os.close(devnull)
+
+
+@config.cli.group()
+def daemon():
+    """Running commands in a warm background process."""
+    if server.ACTIVE:
+        raise dclick.LoggedFailure('The daemon cannot be controlled via "gh-client", use "gh daemon".')
+    if not hasattr(socket, 'AF_UNIX'):
+        raise dclick.LoggedFailure('The daemon needs Unix domain sockets, which this platform lacks.')
+
+
+@daemon.command(name='start')
+@socket_option()
+@click.option('-f', '--foreground', is_flag=True, default=False, help='Do not detach from the terminal.')
+@click.option('--idle-timeout', metavar='SECONDS', type=click.IntRange(0), default=0,
+              help='Stop after this many seconds without a request (0 = never).')
+def daemon_start(socket_path=None, foreground=False, idle_timeout=0):
+    """Start the daemon, which then runs the commands sent by 'gh-client'."""
+    path = socket_path or server.socket_path()
+    try:
+        daemon_server = server.DaemonServer(path, idle_timeout=idle_timeout)
+    except EnvironmentError as cause:
+        if cause.errno == errno.EADDRINUSE:
+            raise dclick.LoggedFailure('A daemon is already listening on "{}"!'.format(path))
+        raise dclick.LoggedFailure('Cannot listen on "{}" ({})'.format(path, cause))
+    server.preload()
+
+    if foreground:
+        click.secho('INFO Serving on "{}" (pid {})'.format(path, os.getpid()), fg='cyan', err=True)
+        daemon_server.serve()
+        return
+
+    pid = os.fork()
+    if pid:
+        daemon_server.socket.close()  # the child process serves it
+        click.echo('INFO Started daemon (pid {}) on "{}"'.format(pid, path))
+        return
+
+    try:
+        detach()
+        daemon_server.serve()
+    finally:
+        os._exit(0)  # pylint: disable=protected-access
+
+
+@daemon.command(name='stop')
+@socket_option()
+def daemon_stop(socket_path=None):
+    """Stop the daemon."""
+    path = socket_path or server.socket_path()
+    status = server.control(server.SHUTDOWN, path)
+    if status is None:
+        click.echo('INFO No daemon is listening on "{}".'.format(path))
+    else:
+        click.echo('INFO Stopped daemon (pid {}) after {} request(s).'.format(status['pid'], status['requests']))
+
+
+@daemon.command(name='status')
+@socket_option()
+@click.pass_context
+def daemon_status(ctx, socket_path=None):
+    """Show whether the daemon is running; the exit code is 1 if not."""
+    path = socket_path or server.socket_path()
+    status = server.control(server.STATUS, path)
+    if status is None:
+        click.echo('No daemon is listening on "{}".'.format(path))
+        ctx.exit(1)
+    click.echo('Daemon (pid {}) on "{}", up {:.0f}s, served {} request(s).'.format(
+               status['pid'], status['socket'], time.time() - status['started'], status['requests']))
@@ -21,87 +21,512 @@ from __future__ import absolute_import, unicode_literals, print_function
 
 import os
 import re
+import json
+import time
+import sqlite3
+import functools
 
 import click
 from click.exceptions import UsageError
-import tablib
 
-# TODO: clear up license situation before a final release, or switch to something else
-import qstatpretty.ttyutil.color as ttycolor
-import qstatpretty.ttyutil.table as ttytable
-import qstatpretty.ttyutil.resize as ttyresize
-# import qstatpretty.ttyutil.size as ttysize
-
-from .. import config, github
+from .. import config, github, snapshots
 from .._compat import text_type, string_types
-from ..util import dclick
+from ..util import dclick, parallel, tabular, ttytable
+from ..util.journal import Journal, journal_key, STARTED, DONE
 
 
-DESERIALIZERS = ('json', 'yaml', 'csv', 'tsv')
+DESERIALIZERS = ('json', 'jsonl', 'yaml', 'csv', 'tsv')
 SERIALIZERS_NEED_NL = ('dict', 'json', 'html')
-SERIALIZERS_TEXT = SERIALIZERS_NEED_NL + ('yaml', 'csv', 'tsv')
+SERIALIZERS_TEXT = SERIALIZERS_NEED_NL + ('jsonl', 'yaml', 'csv', 'tsv')
 SERIALIZERS_BINARY = ('ods', 'xls')  # this just doesn't work right (Unicode issues): , 'xlsx')
 SERIALIZERS = SERIALIZERS_TEXT + SERIALIZERS_BINARY  # TODO: export to 'tty'
 HEADERS = ('Name', 'Color')
+STYLE_REPO = dict(fg='white', bg='blue', bold=True)
+STYLE_WARNING = dict(fg='black', bg='yellow', bold=True)
+STYLE_ADDED = dict(fg='green')
+STYLE_REMOVED = dict(fg='red')
+STYLE_CHANGED = dict(fg='yellow')
 
-DEFAULT_TABLE_FORMAT = [
-    {
-        'key': 'name',
-        'title': 'name',
-        'color': lambda x: ttycolor.COLOR_GREEN,
-        'ellipsis': ttyresize.simple_ellipsis(),
-        'fval': ttyresize.simple_value(factor=10, overflow=2),
-    },
-    {
-        'key': 'color',
-        'title': 'user',
-        'color': lambda x: ttycolor.COLOR_YELLOW,
-        'ellipsis': ttyresize.simple_ellipsis(),
-        'fval': ttyresize.simple_value(factor=3),
-    },
-]
 
+# Column styles of label listings
+TABLE_STYLES = [dict(fg='green'), dict(fg='yellow')]
 
-def get_repo(api, repo):
-    """Get account name, repo name, and repository object from name ``repo``."""
+
+def split_repo(api, repo):
+    """Get account name and repo name from name ``repo``."""
     if '/' in repo:
         user, repo = repo.split('/', 1)
     else:
         user = api.gh_config.user
-    return user, repo, api.repository(user, repo)
+    return user, repo
+
+
+def get_repo(api, repo):
+    """ Get account name, repo name, and a repository handle from name ``repo``.
+
+        The handle provides label access without fetching the repository
+        metadata, see ``github.RepoHandle``.
+    """
+    user, repo = split_repo(api, repo)
+    return user, repo, github.repo_handle(api, user, repo)
+
+
+def label_dataset(labels):
+    """Convert label objects to sorted dataset rows."""
+    return sorted((label.name, '#' + label.color) for label in labels)
 
 
 def get_labels(api, repo):
     """Get label dataset for a repo."""
+    return read_labels(api, repo)[:3]
+
+
+def read_labels(api, repo):
+    """Get label dataset for a repo, plus the ``ETag`` of the listing (or ``None``)."""
     user, repo, gh_repo = get_repo(api, repo)
-    data = sorted((label.name, '#' + label.color) for label in gh_repo.labels())
-    return user, repo, data
+    labels = gh_repo.labels() if gh_repo else None
+    if labels is None:
+        raise dclick.LoggedFailure('Non-existing repo "{}/{}"!'.format(user, repo))
+    return user, repo, label_dataset(labels), getattr(gh_repo, 'etag', None) or getattr(labels, 'etag', None)
+
+
+def open_snapshots(api):
+    """Return the label snapshot store for the site ``api`` is connected to, or ``None``."""
+    cfg = api.gh_config
+    path = getattr(cfg, 'snapshot_file', None)
+    if not path:
+        return None
+    try:
+        return snapshots.SnapshotStore(cfg.site, path)
+    except (EnvironmentError, sqlite3.Error) as cause:
+        click.secho('WARN Label snapshots are not available ({})'.format(cause), fg='yellow', err=True)
+        return None
+
+
+def prefetch_labels(api, repos, jobs=parallel.DEFAULT_JOBS):
+    """ Read the labels of all ``repos`` on the asyncio engine, or with batched GraphQL queries.
+
+        Returns a mapping of ``(user, repo)`` tuples to label lists, or
+        ``None`` for non-existing repos. The mapping is empty when the
+        GraphQL API is not available, so callers use REST calls instead.
+    """
+    names = [split_repo(api, i) for i in repos]
+    if github.use_asyncio():
+        return dict(zip(names, github.aio_map(lambda client, name: client.labels(*name), names, limit=jobs)))
+
+    try:
+        return github.batch_labels(api, names, jobs=jobs)
+    except github.GraphQLError:
+        return {}
+
+
+def stream_repos(api, repos, jobs=parallel.DEFAULT_JOBS):
+    """ Expand the repository selectors in ``repos``, and yield the names in chunks.
+
+        Listings of organizations or users are read in the background,
+        so that work on the first chunks overlaps with fetching further pages.
+    """
+    names = github.select_repos(api, repos)
+    if any(github.parse_repo_selector(i) for i in repos):
+        names = parallel.readahead(names)
+    return parallel.chunked(names, github.GRAPHQL_BATCH_SIZE * jobs)
+
+
+def fetch_labels(api, repos, jobs=parallel.DEFAULT_JOBS, max_age=None):
+    """ Concurrently get label datasets for several repos.
+
+        Yields ``get_labels`` results in the order of ``repos``,
+        with any selectors expanded (see ``stream_repos``).
+        Fetched labels are recorded as snapshots, and snapshots
+        younger than ``max_age`` seconds are used instead of API calls.
+    """
+    def fetch(listings, reponame):
+        "Helper"
+        user, repo = split_repo(api, reponame)
+        if (user, repo) not in listings:
+            return read_labels(api, reponame)
+        if listings[user, repo] is None:
+            raise dclick.LoggedFailure('Non-existing repo "{}/{}"!'.format(user, repo))
+        return user, repo, label_dataset(listings[user, repo]), None
+
+    store = open_snapshots(api)
+    try:
+        for chunk in stream_repos(api, repos, jobs=jobs):
+            fresh = {}
+            if store and max_age:
+                for reponame in chunk:
+                    snapshot = store.get(*split_repo(api, reponame), max_age=max_age)
+                    if snapshot:
+                        fresh[reponame] = snapshot
+            stale = [i for i in chunk if i not in fresh]
+            listings = prefetch_labels(api, stale, jobs=jobs) if stale else {}
+            results = parallel.ordered_map(functools.partial(fetch, listings), stale, jobs=1 if listings else jobs)
+
+            for reponame in chunk:
+                if reponame in fresh:
+                    snapshot = fresh[reponame]
+                    yield snapshot.owner, snapshot.repo, label_dataset(snapshot.labels)
+                else:
+                    user, repo, data, etag = next(results)
+                    if store:
+                        store.put(user, repo, data, etag=etag)
+                    yield user, repo, data
+    finally:
+        if store:
+            store.close()
+
+
+def print_labels(user, repo, data):
+    """Print a label dataset as a table, row by row."""
+    click.secho('⎇   {}/{}'.format(user, repo), **STYLE_REPO)
+    ttytable.echo_table(HEADERS, data, styles=TABLE_STYLES)
 
 
 def dump_labels(api, repo):
     """Dump labels of a repo."""
-    def padded(rows):
+    print_labels(*get_labels(api, repo))
+
+
+class ImportPlan(object):
+    """ The changeset needed to bring a repo's labels in line with an import set.
+
+        ``create`` holds ``(name, color)`` tuples, ``update`` holds
+        ``(label, color)`` tuples with the existing label object, ``delete``
+        holds existing label objects, while ``unchanged`` and ``unique``
+        are sorted lists of label names.
+
+        Labels not in the import set are deleted when the ``prune``
+        predicate accepts their name, all other ones are ``unique``.
+    """
+
+    def __init__(self, existing_labels, import_labels, prune=None):
+        """Plan changes based on a single listing of the repo's labels."""
+        labels = import_labels.copy()
+        self.pruning = prune is not None
+        self.update = []
+        self.delete = []
+        self.unchanged = []
+        self.unique = []
+        for existing in existing_labels:
+            if existing.name in labels:
+                color = labels.pop(existing.name)
+                if existing.color != color:
+                    self.update.append((existing, color))
+                else:
+                    self.unchanged.append(existing.name)
+            elif prune and prune(existing.name):
+                self.delete.append(existing)
+            else:
+                self.unique.append(existing.name)
+        self.create = sorted(labels.items())
+        self.delete.sort(key=lambda i: i.name)
+        self.unchanged.sort()
+        self.unique.sort()
+
+    def __len__(self):
+        """Return the number of required writes."""
+        return len(self.update) + len(self.create) + len(self.delete)
+
+    def describe(self):
+        """Yield a human-readable description of the planned changes."""
+        for existing, color in self.update:
+            yield 'PLAN Update label "{}" from #{} to #{}'.format(existing.name, existing.color, color)
+        for name, color in self.create:
+            yield 'PLAN Create label "{}" with color #{}'.format(name, color)
+        for existing in self.delete:
+            yield 'PLAN Delete label "{}" with color #{}'.format(existing.name, existing.color)
+        if not self:
+            yield 'INFO No changes.'
+        elif self.unchanged:
+            yield 'INFO {} label(s) already up to date.'.format(len(self.unchanged))
+
+    def writes(self):
+        """ Return the planned writes as ``(existing, name, color)`` tuples.
+
+            ``existing`` is ``None`` for new labels, and ``color`` is ``None`` for deleted ones.
+        """
+        return [(existing, existing.name, color) for existing, color in self.update] + \
+               [(None, name, color) for name, color in self.create] + \
+               [(existing, existing.name, None) for existing in self.delete]
+
+    def journal_entry(self):
+        """Return the planned writes as ``[name, color, created]`` lists, for a journal."""
+        return [[name, color, existing is None] for existing, name, color in self.writes()]
+
+    @staticmethod
+    def message(success, existing, name, color):
+        """Return the status message for a write."""
+        if color is None:
+            return '{:4s} Deleted label "{}" with color #{}'.format('OK' if success else 'ERR', name, existing.color)
+        return '{:4s} {} label "{}" with color #{}'.format(
+               'OK' if success else 'ERR', 'Created' if existing is None else 'Updated', name, color)
+
+    def execute(self, gh_repo, jobs=1, executor=None):
+        """Perform the planned writes, yielding ``(success, message)`` for each of them."""
+        def write(args):
+            "Helper"
+            existing, name, color = args
+            if existing is None:
+                success = gh_repo.create_label(name, color)
+            elif color is None:
+                success = existing.delete()
+            else:
+                success = existing.update(name, color)
+            return bool(success), self.message(success, existing, name, color)
+
+        return parallel.ordered_map(write, self.writes(), jobs=jobs, executor=executor)
+
+    def report(self, user, repo, messages):
+        """Return the ``(message, style)`` tuples reported for a repo."""
+        report = [('⎇   {}/{}'.format(user, repo), STYLE_REPO)]
+        report.extend((message, {}) for message in messages)
+
+        # Show info on labels not in the import set
+        if self.unique and not self.pruning:
+            report.append(("INFO Unique labels in this repo: {}".format(', '.join(self.unique)), {}))
+
+        return report
+
+
+def plan_imports(api, repos, import_labels, prune=None, jobs=parallel.DEFAULT_JOBS, skip=()):
+    """ Expand the selectors in ``repos``, and yield the planned changes chunk by chunk.
+
+        Each chunk is a list of ``(reponame, user, repo, plan)`` tuples,
+        where ``plan`` is an ``ImportPlan`` (see there regarding ``prune``),
+        or ``None`` for a non-existing repo. The labels of a chunk are read
+        at once (see ``prefetch_labels``), and repos in ``skip`` are left out.
+    """
+    def plan(listings, reponame):
         "Helper"
-        for row in rows:
-            yield tuple(' {} '.format(cell) for cell in row)
+        user, repo = split_repo(api, reponame)
+        if (user, repo) in listings:
+            existing_labels = listings[user, repo]
+        else:
+            _, _, gh_repo = get_repo(api, reponame)
+            existing_labels = gh_repo.labels() if gh_repo else None
+        if existing_labels is None:
+            return reponame, user, repo, None
+        return reponame, user, repo, ImportPlan(existing_labels, import_labels, prune=prune)
+
+    for chunk in stream_repos(api, repos, jobs=jobs):
+        chunk = [i for i in chunk if i not in skip]
+        if chunk:
+            listings = prefetch_labels(api, chunk, jobs=jobs)
+            yield list(parallel.ordered_map(functools.partial(plan, listings), chunk, jobs=jobs))
+
+
+def planned_deletions(plans):
+    """Return the number of label deletions in ``plans`` (chunks of ``plan_imports``)."""
+    return sum(len(plan.delete) for chunk in plans for _, _, _, plan in chunk if plan)
+
+
+def import_repo(api, planned, dry_run=False, jobs=1, executor=None, journal=None):
+    """ Make (or with ``dry_run``, describe) the ``planned`` changes of a single repo.
+
+        ``planned`` is a tuple as yielded by ``plan_imports``. Label writes
+        are issued concurrently via ``executor``, after recording the plan in
+        the ``journal`` (if any).
+        The result is a ``(success, report)`` tuple; ``success`` is false when the
+        repo does not exist or any write failed, and ``report`` is a list of
+        ``(message, style)`` tuples, so that the output of repos processed in
+        parallel can be emitted grouped and in a stable order.
+    """
+    reponame, user, repo, plan = planned
+    if plan is None:
+        return False, [('ERR  Non-existing repo "{}"!'.format(reponame), STYLE_WARNING)]
+
+    success = True
+    if dry_run or not plan:
+        messages = plan.describe()
+    else:
+        gh_repo = github.repo_handle(api, user, repo) if plan.create else None
+        if journal:
+            journal.record(reponame, STARTED, plan=plan.journal_entry())
+        results = list(plan.execute(gh_repo, jobs=jobs, executor=executor))
+        success = all(ok for ok, _ in results)
+        messages = [message for _, message in results]
+
+    return success, plan.report(user, repo, messages)
+
+
+def import_repos_async(chunk, dry_run=False, jobs=parallel.DEFAULT_JOBS, journal=None):
+    """ Like ``import_repo`` for all repos in a ``chunk`` of plans, with label writes on the asyncio engine.
+
+        Yields one ``(success, report)`` tuple per repo.
+    """
+    writes = []
+    for reponame, user, repo, plan in chunk:
+        if plan and not dry_run:
+            if journal:
+                journal.record(reponame, STARTED, plan=plan.journal_entry())
+            writes.extend((user, repo, None if existing is None else existing.name, name, color)
+                          for existing, name, color in plan.writes())
+
+    def write(client, args):
+        "Helper"
+        if args[-1] is None:
+            return client.delete_label(*args[:3])
+        return client.write_label(*args)
+
+    results = iter(github.aio_map(write, writes, limit=jobs) if writes else [])
+    for reponame, user, repo, plan in chunk:
+        if plan is None:
+            yield False, [('ERR  Non-existing repo "{}"!'.format(reponame), STYLE_WARNING)]
+        elif dry_run or not plan:
+            yield True, plan.report(user, repo, plan.describe())
+        else:
+            outcomes = [(next(results), i) for i in plan.writes()]
+            yield all(ok for ok, _ in outcomes), plan.report(user, repo, [plan.message(ok, *i) for ok, i in outcomes])
+
+
+def export_dataset(api, repo, outfile, serializer, jobs=parallel.DEFAULT_JOBS, max_age=None):
+    """Export labels via a ``tablib.Dataset``, for formats without a streaming writer."""
+    import tablib
+
+    tabdata = tablib.Dataset()
+    for idx, (user, reponame, data) in enumerate(fetch_labels(api, repo, jobs=jobs, max_age=max_age)):
+        if not idx:
+            tabdata.headers = HEADERS
+        tabdata.append_separator('⎇   {}/{}'.format(user, reponame))
+        tabdata.extend(data)
+
+    text = getattr(tabdata, serializer)
+    if not isinstance(text, string_types):
+        text = repr(text)
+    if serializer in SERIALIZERS_NEED_NL:
+        text += '\n'
+    if isinstance(text, text_type):
+        text = text.encode('utf-8')
+    outfile.write(text)
 
-    user, repo, data = get_labels(api, repo)
-    data = padded([HEADERS] + list(data))
 
-    # terminal_width = ttysize.terminal_size()[0]
-    table_format = DEFAULT_TABLE_FORMAT
-    delimiters = ttytable.DELIMITERS_FULL
+def apply_labels(api, plans, dry_run=False, jobs=parallel.DEFAULT_JOBS, journal=None):
+    """ Make the changes in ``plans`` (chunks of ``plan_imports``), and print a report per repo.
 
-    table = list(data)
-    # table = ttyresize.grow_table(data, terminal_width, table_format, delimiters)
-    click.secho('⎇   {}/{}'.format(user, repo), fg='white', bg='blue', bold=True)
-    click.echo(ttytable.pretty_table(table, table_format, delimiters=delimiters))
+        With ``dry_run``, the changes are only described. Repos are recorded
+        in the ``journal`` when done. Returns the number of failed repos.
+    """
+    store = open_snapshots(api)
+    failed = 0
+    try:
+        with parallel.pool(jobs) as writer:
+            for chunk in plans:
+                for reponame, _, _, _ in chunk:
+                    if journal and journal.states.get(reponame) == STARTED:
+                        click.echo('INFO Re-verifying "{}", which was interrupted.'.format(reponame))
+
+                if github.use_asyncio():
+                    reports = import_repos_async(chunk, dry_run=dry_run, jobs=jobs, journal=journal)
+                else:
+                    reports = parallel.ordered_map(functools.partial(
+                        import_repo, api, dry_run=dry_run, jobs=jobs, executor=writer, journal=journal), chunk, jobs=jobs)
+
+                for (reponame, _, _, _), (success, report) in zip(chunk, reports):
+                    for message, style in report:
+                        click.secho(message, **style)
+                    if not success:
+                        failed += 1
+                    elif journal:
+                        journal.record(reponame, DONE)
+
+                if store and not dry_run:
+                    for _, user, repo, _ in chunk:
+                        store.drop(user, repo)  # snapshot is outdated
+    finally:
+        if store:
+            store.close()
+
+    return failed
+
+
+def open_journal(api, repos, import_labels, resume=False, prune=False):
+    """ Return the journal of a label import, or ``None`` when journals are not available.
+
+        Failing to write the journal is only fatal when an import is to be resumed.
+    """
+    cfg = api.gh_config
+    path = getattr(cfg, 'journal_dir', None)
+    if not path:
+        return None
+
+    header = dict(command='label import', site=cfg.site, repos=list(repos), labels=import_labels)
+    if prune:
+        header.update(prune=True)
+    try:
+        journal = Journal(os.path.join(path, journal_key(header) + '.jsonl'), header, resume=resume)
+    except EnvironmentError as cause:
+        if resume:
+            raise dclick.LoggedFailure('Cannot write import journal ({})'.format(cause))
+        click.secho('WARN Import journal is not available ({})'.format(cause), fg='yellow', err=True)
+        return None
+    if resume:
+        if journal.resumed:
+            click.echo('INFO Resuming import, {} repo(s) already done.'.format(len(journal.keys(DONE))))
+        else:
+            click.secho('WARN No interrupted import of this data found, starting from the beginning.',
+                        fg='yellow', err=True)
+    return journal
+
+
+def select_snapshots(store, selectors, user=None):
+    """ Expand repository selectors to the names of recorded snapshots.
+
+        This works like ``github.select_repos``, but offline. Plain repo
+        names need an owner, unless a default ``user`` is given.
+    """
+    recorded = store.names()
+    seen = set()
+    for selector in selectors:
+        parsed = github.parse_repo_selector(selector)
+        if parsed is None:
+            if '/' not in selector and not user:
+                raise dclick.LoggedFailure('No owner given for repo "{}", use "‹owner›/{}"!'.format(selector, selector))
+            names = [selector if '/' in selector else '{}/{}'.format(user, selector)]
+        else:
+            _, owner, matcher = parsed
+            names = [i for i in recorded if i.split('/')[0] == owner and matcher(i.split('/', 1)[1])]
+        for name in names:
+            if name not in seen:
+                seen.add(name)
+                yield name
+
+
+def diff_labels(base, other):
+    """Compare the label snapshot ``other`` to ``base``, and return a list of ``(message, style)`` tuples."""
+    base_labels, other_labels = dict(base.labels), dict(other.labels)
+    messages = []
+    for name in sorted(set(base_labels) | set(other_labels)):
+        if name not in other_labels:
+            messages.append(('-    {} #{}'.format(name, base_labels[name]), STYLE_REMOVED))
+        elif name not in base_labels:
+            messages.append(('+    {} #{}'.format(name, other_labels[name]), STYLE_ADDED))
+        elif base_labels[name] != other_labels[name]:
+            messages.append(('~    {} #{} → #{}'.format(name, base_labels[name], other_labels[name]), STYLE_CHANGED))
+
+    same = len(set(base_labels) & set(other_labels)) - sum(1 for _, i in messages if i is STYLE_CHANGED)
+    if not messages:
+        messages.append(('INFO No differences.', {}))
+    elif same:
+        messages.append(('INFO {} label(s) are the same.'.format(same), {}))
+    return messages
+
+
+def format_time(stamp):
+    """Format a UNIX timestamp in local time."""
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(stamp))
+
+
+def max_age_option():
+    """``--max-age`` option for commands reading labels."""
+    return click.option('--max-age', type=click.IntRange(0), default=0, metavar='SECONDS',
+                        help="Use label snapshots younger than this, instead of reading from GitHub.")
 
 
 class LabelAliases(dclick.AliasedGroup):
     """Alias mapping for 'label' commands."""
     MAP = dict(
         ls='list',
+        rm='delete',
     )
 
 
@@ -111,138 +536,215 @@ def label():
 
 
 @label.command(name='list')
+@parallel.jobs_option()
+@max_age_option()
 @click.argument('repo', nargs=-1)
-def label_list(repo=None):
+def label_list(repo=None, jobs=parallel.DEFAULT_JOBS, max_age=0):
     """Dump labels within the given repo(s)."""
-    api = github.api(config=None)  # TODO: config object
+    with github.open(config=None) as api:  # TODO: config object
 
-    for idx, reponame in enumerate(repo or []):
-        if idx:
-            click.echo('')
-        dump_labels(api, reponame)
+        for idx, labels in enumerate(fetch_labels(api, repo or [], jobs=jobs, max_age=max_age)):
+            if idx:
+                click.echo('')
+            print_labels(*labels)
 
 
 @label.command()
 @click.option('-f', '--format', 'serializer', default=None, type=click.Choice(SERIALIZERS),
     help="Output format (defaults to extension of OUTFILE).",
 )
+@parallel.jobs_option()
+@max_age_option()
 @click.argument('repo', nargs=-1)
 @click.argument('outfile', type=click.File('wb'))
 @click.pass_context
-def export(ctx, repo, outfile, serializer):
+def export(ctx, repo, outfile, serializer, jobs, max_age):
     """Export labels of the given repo(s) to a file."""
-    api = github.api(config=None)  # TODO: config object
-    tabdata = tablib.Dataset()
-    if repo and repo[-1].lower() == 'to':
-        repo = repo[:-1]
-    if not repo:
-        raise UsageError("You provided no repository names!", ctx=ctx)
-    outname = getattr(outfile, 'name', None)
-    if serializer is None:
-        _, ext = os.path.splitext(outname or '<stream>')
-        ext = ext.lstrip('.')
-        if ext in SERIALIZERS:
-            serializer = ext
-        else:
-            raise UsageError('No --format given, and extension of "{}" is not one of {}.'
-                             .format(outname or '<stream>', ', '.join(SERIALIZERS)), ctx=ctx)
-
-    for idx, reponame in enumerate(repo):
-        user, repo, data = get_labels(api, reponame)
-        if not idx:
-            tabdata.headers = HEADERS
-        tabdata.append_separator('⎇   {}/{}'.format(user, repo))
-        tabdata.extend(data)
-
-    text = getattr(tabdata, serializer)
-    if not isinstance(text, string_types):
-        text = repr(text)
-    if serializer in SERIALIZERS_NEED_NL:
-        text += '\n'
-    if isinstance(text, text_type):
-        text = text.encode('utf-8')
-    try:
-        outfile.write(text)
-    except EnvironmentError as cause:
-        raise dclick.LoggedFailure('Error while writing "{}" ({})'
-                                   .format(outname or '<stream>', cause))
+    with github.open(config=None) as api:  # TODO: config object
+        if repo and repo[-1].lower() == 'to':
+            repo = repo[:-1]
+        if not repo:
+            raise UsageError("You provided no repository names!", ctx=ctx)
+        outname = getattr(outfile, 'name', None)
+        if serializer is None:
+            _, ext = os.path.splitext(outname or '<stream>')
+            ext = ext.lstrip('.')
+            if ext in SERIALIZERS:
+                serializer = ext
+            else:
+                raise UsageError('No --format given, and extension of "{}" is not one of {}.'
+                                 .format(outname or '<stream>', ', '.join(SERIALIZERS)), ctx=ctx)
+
+        try:
+            if serializer in tabular.WRITERS:
+                # Write each repo's labels as soon as they're available
+                with tabular.writer(serializer, outfile, HEADERS) as writer:
+                    for _, _, data in fetch_labels(api, repo, jobs=jobs, max_age=max_age):
+                        writer.write_rows(data)
+            else:
+                export_dataset(api, repo, outfile, serializer, jobs=jobs, max_age=max_age)
+        except EnvironmentError as cause:
+            raise dclick.LoggedFailure('Error while writing "{}" ({})'
+                                       .format(outname or '<stream>', cause))
 
 
 @label.command(name='import')
 @click.option('-f', '--format', 'serializer', default=None, type=click.Choice(DESERIALIZERS),
     help="Input format (defaults to extension of INFILE).",
 )
+@click.option('-n', '--dry-run', is_flag=True, default=False, help="Only show the planned changes.")
+@click.option('--resume', is_flag=True, default=False,
+    help="Continue an interrupted import of the same data, skipping repos already done.",
+)
+@click.option('--prune', is_flag=True, default=False, help="Delete all labels that are not in INFILE.")
+@click.option('-y', '--yes', is_flag=True, default=False, help="Prune without asking for confirmation.")
+@parallel.jobs_option()
 @click.argument('repo', nargs=-1)
 @click.argument('infile', type=click.File('r'))
 @click.pass_context
-def label_import(ctx, repo, infile, serializer):
-    """Import labels to the given repo(s) out of a file."""
+def label_import(ctx, repo, infile, serializer, dry_run, resume, prune, yes, jobs):
+    """ Import labels to the given repo(s) out of a file.
+
+        With '--prune', the changes are planned for all repos first, and
+        only made after confirmation.
+    """
     # TODO: refactor prep code to function, see export for dupe code
-    api = github.api(config=None)  # TODO: config object
-    tabdata = tablib.Dataset()
-    if repo and repo[-1].lower() == 'from':
-        repo = repo[:-1]
+    import tablib
+
+    with github.open(config=None) as api:  # TODO: config object
+        tabdata = tablib.Dataset()
+        if repo and repo[-1].lower() == 'from':
+            repo = repo[:-1]
+        if not repo:
+            raise UsageError("You provided no repository names!", ctx=ctx)
+        inname = getattr(infile, 'name', None)
+        if serializer is None:
+            _, ext = os.path.splitext(inname or '<stream>')
+            ext = ext.lstrip('.')
+            if ext in DESERIALIZERS:
+                serializer = ext
+            else:
+                raise UsageError('No --format given, and extension of "{}" is not one of {}.'
+                                 .format(inname, ', '.join(DESERIALIZERS)), ctx=ctx)
+
+        try:
+            data = infile.read()
+        except EnvironmentError as cause:
+            raise dclick.LoggedFailure('Error while reading "{}" ({})'.format(inname, cause))
+
+        # Read label data, and make it unique
+        if serializer == 'jsonl':
+            try:
+                tabdata.dict = [json.loads(line) for line in data.splitlines() if line.strip()]
+            except ValueError as cause:
+                raise dclick.LoggedFailure('Bad JSON lines in "{}" ({})'.format(inname, cause))
+        else:
+            setattr(tabdata, serializer, data)
+        import_labels = {}
+        for import_label in tabdata.dict:
+            name, color = import_label[HEADERS[0]], import_label[HEADERS[1]].lstrip('#').lower()
+            if not re.match("[0-9a-f]{6}", color):
+                raise dclick.LoggedFailure('Bad color <{}> for label "{}"'.format(color, name))
+            if name in import_labels and color != import_labels[name]:
+                click.echo('INFO Changing color from #{} to #{} for duplicate import label "{}"'
+                           .format(import_labels[name], color, name))
+            import_labels[name] = color
+
+        # Update given repos
+        prune = (lambda name: True) if prune else None
+        journal = None if dry_run else open_journal(api, repo, import_labels, resume=resume, prune=bool(prune))
+        try:
+            plans = plan_imports(api, repo, import_labels, prune=prune, jobs=jobs,
+                                 skip=journal.keys(DONE) if journal else ())
+            if prune and not (dry_run or yes):
+                plans = list(plans)  # deletions are confirmed for all repos up front
+                deletions = planned_deletions(plans)
+                if deletions:
+                    apply_labels(api, plans, dry_run=True, jobs=jobs)
+                    click.confirm('Delete {} label(s) not in the import set?'.format(deletions), abort=True)
+            failed = apply_labels(api, plans, dry_run=dry_run, jobs=jobs, journal=journal)
+        except BaseException:
+            if journal:
+                journal.close()
+                click.secho('INFO Use "--resume" to continue the import.', err=True)
+            raise
+
+        if journal:
+            if failed:
+                journal.close()
+                click.echo('INFO {} repo(s) failed, use "--resume" to retry them.'.format(failed))
+            else:
+                journal.remove()
+
+
+@label.command()
+@click.option('-l', '--label', 'patterns', multiple=True, metavar='PATTERN',
+    help="Names of the labels to delete, as globs, or regular expressions after a '~' (repeatable).",
+)
+@click.option('-n', '--dry-run', is_flag=True, default=False, help="Only show the planned deletions.")
+@click.option('-y', '--yes', is_flag=True, default=False, help="Delete without asking for confirmation.")
+@parallel.jobs_option()
+@click.argument('repo', nargs=-1)
+@click.pass_context
+def delete(ctx, repo, patterns, dry_run, yes, jobs):
+    """ Delete labels matching the given patterns from the given repo(s).
+
+        The deletions are planned for all repos first, and only
+        executed after confirmation.
+    """
     if not repo:
         raise UsageError("You provided no repository names!", ctx=ctx)
-    inname = getattr(infile, 'name', None)
-    if serializer is None:
-        _, ext = os.path.splitext(inname or '<stream>')
-        ext = ext.lstrip('.')
-        if ext in DESERIALIZERS:
-            serializer = ext
-        else:
-            raise UsageError('No --format given, and extension of "{}" is not one of {}.'
-                             .format(inname, ', '.join(DESERIALIZERS)), ctx=ctx)
+    if not patterns:
+        raise UsageError("You provided no label patterns (--label)!", ctx=ctx)
+    matchers = [github.name_matcher(i, what='label') for i in patterns]
 
-    try:
-        data = infile.read()
-    except EnvironmentError as cause:
-        raise dclick.LoggedFailure('Error while reading "{}" ({})'.format(inname, cause))
-
-    # Read label data, and make it unique
-    setattr(tabdata, serializer, data)
-    import_labels = {}
-    for import_label in tabdata.dict:
-        name, color = import_label[HEADERS[0]], import_label[HEADERS[1]].lstrip('#').lower()
-        if not re.match("[0-9a-f]{6}", color):
-            raise dclick.LoggedFailure('Bad color <{}> for label "{}"'.format(color, name))
-        if name in import_labels and color != import_labels[name]:
-            click.echo('INFO Changing color from #{} to #{} for duplicate import label "{}"'
-                       .format(import_labels[name], color, name))
-        import_labels[name] = color
-
-    # Update given repos
-    for reponame in repo:
-        user, repo, gh_repo = get_repo(api, reponame)
-        if not gh_repo:
-            click.secho('ERR  Non-existing repo "{}"!'.format(reponame), fg='black', bg='yellow', bold=True)
-            continue
+    def prune(name):
+        "Helper"
+        return any(matcher(name) for matcher in matchers)
 
-        labels = import_labels.copy()
-        changed = False
-        unique = {}
-        click.secho('⎇   {}/{}'.format(user, repo), fg='white', bg='blue', bold=True)
+    with github.open(config=None) as api:  # TODO: config object
+        plans = list(plan_imports(api, repo, {}, prune=prune, jobs=jobs))
+        apply_labels(api, plans, dry_run=True, jobs=jobs)
+        planned = planned_deletions(plans)
+        if dry_run or not planned:
+            return
+        if not yes:
+            click.confirm('Delete {} label(s)?'.format(planned), abort=True)
+        failed = apply_labels(api, plans, jobs=jobs)
 
-        # Check if existing labels need updating
-        for existing in gh_repo.labels():
-            if existing.name in labels:
-                if existing.color != labels[existing.name]:
-                    status = 'OK' if existing.update(existing.name, labels[existing.name]) else 'ERR'
-                    click.echo('{:4s} Updated label "{}" with color #{}'
-                               .format(status, existing.name, labels[existing.name]))
-                    changed = True
-                del labels[existing.name]
-            else:
-                unique[existing.name] = existing
+    if failed:
+        click.echo('INFO {} repo(s) failed.'.format(failed))
 
-        # Create any remaining labels
-        if labels:
-            for name, color in sorted(labels.items()):
-                status = 'OK' if gh_repo.create_label(name, color) else 'ERR'
-                click.echo('{:4s} Created label "{}" with color #{}'.format(status, name, color))
-        elif not changed:
-            click.echo('INFO No changes.')
 
-        # Show info on labels not in the import set
-        if unique:
-            click.echo("INFO Unique labels in this repo: {}".format(', '.join(sorted(unique.keys()))))
+@label.command()
+@click.argument('repo', nargs=-1)
+@click.pass_context
+def diff(ctx, repo):
+    """ Compare label snapshots of the given repo(s), offline.
+
+        The labels of the first repo are compared to those of all others.
+        Snapshots are recorded by 'label list' and 'label export', and
+        repos can be selected by patterns, like 'org:myorg/py-*'.
+    """
+    cfg = github.GitHubConfig()
+    try:
+        with snapshots.SnapshotStore(cfg.site, cfg.snapshot_file) as store:
+            names = list(select_snapshots(store, repo, user=cfg.user))
+            if len(names) < 2:
+                raise UsageError("You need to provide at least two repositories with snapshots!", ctx=ctx)
+            recorded = [(i, store.get(*i.split('/', 1))) for i in names]
+    except (EnvironmentError, sqlite3.Error) as cause:
+        raise dclick.LoggedFailure('Cannot read label snapshots from "{}" ({})'.format(cfg.snapshot_file, cause))
+
+    for name, snapshot in recorded:
+        if snapshot is None:
+            raise dclick.LoggedFailure('No snapshot of repo "{}", use "label list" first!'.format(name))
+
+    (base_name, base), others = recorded[0], recorded[1:]
+    for idx, (name, snapshot) in enumerate(others):
+        if idx:
+            click.echo('')
+        click.secho('⎇   {} vs. {} (snapshots of {} and {})'.format(
+                    name, base_name, format_time(snapshot.fetched), format_time(base.fetched)), **STYLE_REPO)
+        for message, style in diff_labels(base, snapshot):
+            click.secho(message, **style)
@@ -20,17 +20,78 @@ from __future__ import absolute_import, unicode_literals, print_function
 import click
 
 from .. import config, github
-from ..util import dclick
+from ..util import dclick, parallel, tabular
+
+
+# Account data in machine-readable output formats
+USER_FIELDS = (
+    'login', 'id', 'type', 'name', 'email', 'location', 'html_url', 'created_at', 'updated_at',
+    'public_repos', 'public_gists', 'followers', 'following',
+)
+FORMATS = ['text'] + list(tabular.WRITERS)
+
+
+def get_user(api, username):
+    """Return the data of an account as a dict, or ``None`` if it does not exist."""
+    gh_user = api.user(username)
+    return gh_user.as_dict() if gh_user else None
 
 
 def dump_user(api, username):
     """Dump user information to console."""
-    gh_user = api.user(username)
-    if not gh_user:
+    print_user(username, get_user(api, username))
+
+
+def read_usernames(infile):
+    """Return the account names in ``infile``, one per line; empty lines and ``#`` comments are ignored."""
+    try:
+        lines = infile.read().splitlines()
+    except EnvironmentError as cause:
+        raise dclick.LoggedFailure('Error while reading "{}" ({})'.format(getattr(infile, 'name', '<stream>'), cause))
+    return [i.split('#', 1)[0].strip() for i in lines if i.split('#', 1)[0].strip()]
+
+
+def fetch_users(api, usernames, jobs=parallel.DEFAULT_JOBS, graphql=False):
+    """ Yield ``(username, userdict)`` for all ``usernames``, in input order.
+
+        The accounts are fetched concurrently, and each one is yielded as
+        soon as it and its predecessors are available. With ``graphql``,
+        they're read in batches of many users per query; unknown names
+        (like organizations) are then checked via REST.
+    """
+    if github.use_asyncio():
+        for item in zip(usernames, github.aio_map(lambda client, name: client.user(name), usernames, limit=jobs)):
+            yield item
+        return
+
+    def fetch(name):
+        "Helper"
+        return name, get_user(api, name)
+
+    if graphql:
+        for chunk in parallel.chunked(usernames, github.GRAPHQL_BATCH_SIZE * jobs):
+            try:
+                users = github.batch_users(api, sorted(set(chunk)), jobs=jobs)
+            except github.GraphQLError:
+                break  # fall back to REST calls for this and all further chunks
+            users.update(parallel.ordered_map(fetch, sorted(k for k, v in users.items() if v is None), jobs=jobs))
+            for name in chunk:
+                yield name, users[name]
+            usernames = usernames[len(chunk):]
+        else:
+            return
+
+    for item in parallel.ordered_map(fetch, usernames, jobs=jobs):
+        yield item
+
+
+def print_user(username, userdict):
+    """Print user information, as returned by the API, to console."""
+    if not userdict:
         dclick.serror("Unknown user '{}'".format(username))
         return
 
-    userdict = gh_user.as_dict()
+    userdict = dict(userdict)
     userdict.setdefault('name', '‹N/A›')
     userdict.setdefault('total_private_repos', -1)
     userdict.setdefault('private_gists', -1)
@@ -40,9 +101,9 @@ def dump_user(api, username):
     click.echo("ACCOUNT     %(name)s [%(login)s / %(type)s #%(id)s]" % userdict)
     click.echo("SINCE/LAST  %(created_at)s / %(updated_at)s" % userdict)
     click.echo("URL         %(html_url)s" % userdict)
-    if gh_user.email:
+    if userdict.get('email'):
         click.echo("EMAIL       %(email)s" % userdict)
-    if gh_user.location:
+    if userdict.get('location'):
         click.echo("LOCATION    %(location)s" % userdict)
     click.echo("REPOS/GISTS %(public_repos)s ☑ ⎇  / %(total_private_repos)s ☒ ⎇  "
                "/ %(public_gists)s ☑ ✍ / %(private_gists)s ☒ ✍" % userdict)
@@ -55,11 +116,45 @@ def user():
 
 
 @user.command(name='show')
+@click.option('--from-file', 'infile', metavar='FILE', type=click.File('r'), default=None,
+    help="Read further account names from FILE, one per line ('-' for stdin).",
+)
+@click.option('--graphql', is_flag=True, default=False,
+    help="Look up many users per GraphQL query (falls back to REST calls).",
+)
+@click.option('-f', '--format', 'serializer', default='text', type=click.Choice(FORMATS),
+    help="Output format; all but 'text' write one record per user to stdout.",
+)
+@parallel.jobs_option()
 @click.argument('username', nargs=-1)
-def user_show(username=None):
+def user_show(username=None, infile=None, graphql=False, serializer='text', jobs=parallel.DEFAULT_JOBS):
     """Dump information about the logged-in or given user(s)."""
-    with github.open(config=None) as api: # TODO: config object
-        for idx, username in enumerate(username or [api.gh_config.user]):
+    usernames = list(username or [])
+    if infile:
+        usernames.extend(read_usernames(infile))
+
+    with github.open(config=None) as api:  # TODO: config object
+        usernames = usernames or [api.gh_config.user]
+        users = fetch_users(api, usernames, jobs=jobs, graphql=graphql)
+        if serializer != 'text':
+            write_users(users, serializer)
+            return
+
+        for idx, (name, userdict) in enumerate(users):
             if idx:
                 click.echo('')
-            dump_user(api, username)
+            print_user(name, userdict)
+
+
+def write_users(users, serializer, stream=None):
+    """ Write ``(username, userdict)`` pairs in a ``tabular`` format, as they arrive.
+
+        Unknown users are reported on stderr.
+    """
+    stream = stream or click.get_binary_stream('stdout')
+    with tabular.writer(serializer, stream, USER_FIELDS) as writer:
+        for name, userdict in users:
+            if userdict:
+                writer.write_rows([tuple(userdict.get(i) for i in USER_FIELDS)])
+            else:
+                click.secho("Unknown user '{}'".format(name), fg='white', bg='red', bold=True, err=True)
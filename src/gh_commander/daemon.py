@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+""" Background server that runs ``gh`` command lines in a warm process.
+
+    The server listens on a Unix socket, and executes the command lines
+    sent by clients one after the other, in its own process. So imported
+    modules, loaded commands, and the memoized API connections with their
+    caches and rate limit state survive from one command to the next.
+
+    A request carries the client's ``argv``, working directory, and
+    environment. Output is streamed back as it is written, followed by the
+    exit code. Input is read from the client's ``stdin`` on demand, so that
+    both ``-`` arguments and interactive prompts work. All messages are
+    frames of a channel byte, a payload length, and the payload.
+
+    This module only imports the standard library at the top level, so the
+    client side starts fast.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import io
+import os
+import sys
+import json
+import time
+import errno
+import socket
+import struct
+import traceback
+from contextlib import closing
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from ._compat import PY2
+
+
+HEADER = struct.Struct(b'>cI')
+CHUNK_SIZE = 64 * 1024
+
+# Frame channels
+REQUEST = b'R'  # client → server, a JSON request
+STDIN = b'0'  # client → server, input data; an empty frame marks EOF
+INPUT = b'i'  # server → client, asks for up to the given number of input bytes
+STDOUT = b'1'
+STDERR = b'2'
+EXIT = b'x'  # server → client, the exit code or JSON status, as the last frame
+
+# Commands of a request besides running a command line
+RUN, STATUS, SHUTDOWN = 'run', 'status', 'shutdown'
+
+# Set in the server process
+ACTIVE = False
+
+
+def socket_path():
+    """Return the path of the daemon's socket, taken from ``GH_DAEMON_SOCKET`` or the runtime directory."""
+    if os.environ.get('GH_DAEMON_SOCKET'):
+        return os.path.expanduser(os.environ['GH_DAEMON_SOCKET'])
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'gh-commander.sock')
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(config_home, 'gh', 'daemon.sock')
+
+
+def send_frame(sock, channel, payload=b''):
+    """Send one frame."""
+    sock.sendall(HEADER.pack(channel, len(payload)) + payload)
+
+
+def recv_exactly(sock, size):
+    """Receive ``size`` bytes, or return ``None`` if the connection closes before."""
+    chunks = []
+    while size:
+        data = sock.recv(min(size, CHUNK_SIZE))
+        if not data:
+            return None
+        chunks.append(data)
+        size -= len(data)
+    return b''.join(chunks)
+
+
+def recv_frame(sock):
+    """Receive one frame as a ``(channel, payload)`` tuple, or ``(None, None)`` if the connection is closed."""
+    header = recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None, None
+    channel, size = HEADER.unpack(header)
+    payload = recv_exactly(sock, size)
+    return (None, None) if payload is None else (channel, payload)
+
+
+def connect(path=None):
+    """Return a socket connected to the daemon, or ``None`` if none is listening."""
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or socket_path())
+    except socket.error:
+        sock.close()
+        return None
+    return sock
+
+
+def control(command, path=None):
+    """Send a ``STATUS`` or ``SHUTDOWN`` request, and return the reply data, or ``None`` without a daemon."""
+    sock = connect(path)
+    if sock is None:
+        return None
+    with closing(sock):
+        send_frame(sock, REQUEST, json.dumps(dict(command=command)).encode('utf-8'))
+        channel, payload = recv_frame(sock)
+    return json.loads(payload.decode('utf-8')) if channel == EXIT else None
+
+
+def read_input(stream, size):
+    """Return the input available on ``stream``, up to ``size`` bytes; on a terminal, that is one line."""
+    try:
+        fileno = stream.fileno()
+    except (AttributeError, EnvironmentError, ValueError):
+        return stream.read(size)
+    return os.read(fileno, size)
+
+
+def forward(argv, path=None, stdin=None, stdout=None, stderr=None):
+    """ Run a command line in the daemon, and return its exit code.
+
+        Returns ``None`` when no daemon is listening. The standard input
+        is read when the command asks for it. The streams default to the
+        binary standard streams of this process.
+    """
+    sock = connect(path)
+    if sock is None:
+        return None
+
+    def binary(stream):
+        "Helper"
+        return stream if PY2 else getattr(stream, 'buffer', stream)
+
+    stdin = stdin or binary(sys.stdin)
+    stdout = stdout or binary(sys.stdout)
+    stderr = stderr or binary(sys.stderr)
+    env = dict(os.environ)
+    try:
+        env.setdefault('COLUMNS', str(os.get_terminal_size(sys.stdout.fileno()).columns))
+    except (AttributeError, ValueError, EnvironmentError):
+        pass  # not a terminal
+    request = dict(command=RUN, argv=list(argv), cwd=os.getcwd(), env=env,
+                   isatty=[hasattr(i, 'isatty') and i.isatty() for i in (stdin, stdout, stderr)])
+
+    with closing(sock):
+        send_frame(sock, REQUEST, json.dumps(request).encode('utf-8'))
+        while True:
+            channel, payload = recv_frame(sock)
+            if channel == INPUT:
+                send_frame(sock, STDIN, read_input(stdin, int(payload)))
+            elif channel in (STDOUT, STDERR):
+                stream = stdout if channel == STDOUT else stderr
+                stream.write(payload)
+                stream.flush()
+            elif channel == EXIT:
+                return int(payload)
+            else:
+                stderr.write(b'ERR  Lost connection to the gh daemon\n')
+                stderr.flush()
+                return 1
+
+
+class FrameWriter(io.RawIOBase):
+    """A writable stream that sends each write as a frame on ``channel``."""
+
+    def __init__(self, sock, channel, tty=False):
+        io.RawIOBase.__init__(self)
+        self.sock = sock
+        self.channel = channel
+        self.tty = tty
+        self.broken = False
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, data):  # pylint: disable=arguments-differ
+        if data and not self.broken:
+            try:
+                send_frame(self.sock, self.channel, bytes(data))
+            except socket.error:
+                self.broken = True  # the client went away, discard the remaining output
+        return len(data)
+
+
+class FrameReader(io.RawIOBase):
+    """ A readable stream that asks the client for input whenever it is read.
+
+        Pending output is flushed first, so that prompts are visible.
+    """
+
+    def __init__(self, sock, tty=False):
+        io.RawIOBase.__init__(self)
+        self.sock = sock
+        self.tty = tty
+        self.eof = False
+
+    def readable(self):
+        return True
+
+    def isatty(self):
+        return self.tty
+
+    def readinto(self, buf):
+        if self.eof:
+            return 0
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except EnvironmentError:
+                pass
+        try:
+            send_frame(self.sock, INPUT, str(len(buf)).encode('ascii'))
+            channel, payload = recv_frame(self.sock)
+        except socket.error:
+            channel, payload = None, None
+        if channel != STDIN or not payload:
+            self.eof = True
+            return 0
+        buf[:len(payload)] = payload
+        return len(payload)
+
+
+def text_stream(sock, channel, tty=False):
+    """Return a ``sys.stdout`` replacement that sends frames on ``channel``."""
+    stream = io.BufferedWriter(FrameWriter(sock, channel, tty), buffer_size=CHUNK_SIZE)
+    if PY2:
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8', errors='replace', line_buffering=True)
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """ Unix socket server executing the requests of ``gh`` clients, one at a time.
+
+        After ``idle_timeout`` seconds without a request (when not zero),
+        the server stops.
+    """
+
+    def __init__(self, path, idle_timeout=0):
+        self.path = path
+        self.started = time.time()
+        self.requests = 0
+        self.stopped = False
+        self.timeout = idle_timeout or None
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        if os.path.exists(path):
+            if connect(path) is not None:
+                raise EnvironmentError(errno.EADDRINUSE, 'A daemon is already listening', path)
+            os.remove(path)  # a stale socket
+
+        umask = os.umask(0o077)  # only the owner may connect
+        try:
+            socketserver.UnixStreamServer.__init__(self, path, DaemonHandler)
+        finally:
+            os.umask(umask)
+
+    def serve(self):
+        """Handle requests until stopped by a client, or the idle timeout."""
+        global ACTIVE  # pylint: disable=global-statement
+
+        ACTIVE = True
+        try:
+            while not self.stopped:
+                self.handle_request()
+        finally:
+            ACTIVE = False
+            self.server_close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def handle_timeout(self):
+        self.stopped = True
+
+    def status(self):
+        """Return the server state as a dict."""
+        return dict(pid=os.getpid(), started=self.started, requests=self.requests, socket=self.path)
+
+
+class DaemonHandler(socketserver.BaseRequestHandler):
+    """Handler of one client connection."""
+
+    def handle(self):
+        channel, payload = recv_frame(self.request)
+        if channel != REQUEST:
+            return
+        request = json.loads(payload.decode('utf-8'))
+        command = request.get('command')
+
+        if command == RUN:
+            self.server.requests += 1
+            code = run(self.request, request)
+            send_frame(self.request, EXIT, str(code).encode('ascii'))
+        elif command in (STATUS, SHUTDOWN):
+            self.server.stopped = command == SHUTDOWN
+            send_frame(self.request, EXIT, json.dumps(self.server.status()).encode('utf-8'))
+
+
+def run(sock, request):
+    """ Run the command line of a ``request`` in this process, and return the exit code.
+
+        Input comes from, and output goes to the client on ``sock``. The
+        process state changed for the request (environment, working directory,
+        standard streams) is restored afterwards.
+    """
+    from . import config, github
+
+    isatty = request.get('isatty') or [False] * 3
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    try:
+        os.environ.clear()
+        os.environ.update(request.get('env') or {})
+        os.chdir(request.get('cwd') or saved_cwd)
+        sys.stdin = io.BufferedReader(FrameReader(sock, isatty[0]), buffer_size=CHUNK_SIZE)
+        if not PY2:
+            sys.stdin = io.TextIOWrapper(sys.stdin, encoding='utf-8')
+        sys.stdout = text_stream(sock, STDOUT, isatty[1])
+        sys.stderr = text_stream(sock, STDERR, isatty[2])
+
+        try:
+            config.cli.main(args=request.get('argv') or [], prog_name=config.APP_NAME)
+            code = 0
+        except SystemExit as exc:
+            code = exc.code
+            if code is not None and not isinstance(code, int):
+                sys.stderr.write('{}\n'.format(code))
+                code = 1
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc()
+            code = 1
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except EnvironmentError:
+                pass
+        return code or 0
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        os.environ.clear()
+        os.environ.update(saved_env)
+        os.chdir(saved_cwd)
+        if github.GitHubConfig.PROFILE:
+            github.api.memo.discard(github.GitHubConfig.PROFILE)  # profiled connections are not reused
+        github.GitHubConfig.PROFILE = None
+
+
+def preload():
+    """Import all command modules and their dependencies, so requests do not pay for it."""
+    from . import config, github  # noqa pylint: disable=unused-variable
+
+    for name in config.cli.list_commands(None):
+        config.cli.get_command(None, name)
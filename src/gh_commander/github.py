@@ -18,16 +18,62 @@
 from __future__ import absolute_import, unicode_literals, print_function
 
 import os
+import re
+import json
+import time
+import random
 import errno
+import socket
+import fnmatch
+import functools
 import threading
 from netrc import netrc, NetrcParseError
+from collections import Counter, namedtuple
 from contextlib import contextmanager
 
-from requests.exceptions import ConnectionError
+import click
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
 from github3 import *  # pylint: disable=wildcard-import
+from github3.issues.label import Label
+from github3.models import GitHubCore
+from github3.repos.repo import Repository
+from github3.structs import GitHubIterator
 
-from ._compat import urlparse
-from .util import dclick
+from . import config as appconfig
+from ._compat import urlparse, url_quote
+from .util import dclick, httpcache, parallel
+
+
+GRAPHQL_BATCH_SIZE = 25
+PAGE_SIZE = 100  # maximum of the REST API
+PAGE_JOBS = 4
+PAGE_NUMBER = re.compile(r'([?&]page=)(\d+)')
+GRAPHQL_LABELS_QUERY = """
+    r{idx}: repository(owner: $owner{idx}, name: $name{idx}) {{
+        labels(first: 100, after: $after{idx}) {{
+            nodes {{ name color }}
+            pageInfo {{ hasNextPage endCursor }}
+        }}
+    }}"""
+GRAPHQL_USER_QUERY = """
+    u{idx}: user(login: $login{idx}) {{
+        login name databaseId email location url createdAt updatedAt
+        repositories(privacy: PUBLIC) {{ totalCount }}
+        gists(privacy: PUBLIC) {{ totalCount }}
+        followers {{ totalCount }}
+        following {{ totalCount }}
+    }}"""
+
+
+ConnectionKey = namedtuple('ConnectionKey', 'credentials options profile')
+
+REPO_SELECTOR_KINDS = ('org', 'user')
+REPO_GLOB_CHARS = '*?['
+
+
+class GraphQLError(Exception):
+    """GraphQL API is not available or failed, use REST calls instead."""
 
 
 def pretty_cause(cause, prefix=None):
@@ -40,6 +86,31 @@ def pretty_cause(cause, prefix=None):
     return msg
 
 
+def parse_bool(text):
+    """Return the truth value of a yes/no setting."""
+    text = text.strip().lower()
+    if text in ('1', 'true', 'yes', 'on'):
+        return True
+    if text in ('', '0', 'false', 'no', 'off'):
+        return False
+    raise ValueError('not a yes/no value: {!r}'.format(text))
+
+
+def env_setting(name, default, parse=float):
+    """ Return the environment variable ``name`` converted by ``parse``, or ``default`` if it is not set.
+
+        A bad value is reported as a failure that names the variable.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return parse(value)
+    except ValueError:
+        raise dclick.LoggedFailure('Bad value "{}" in environment variable {}, expected {}!'.format(
+                                   value, name, {float: 'a number', int: 'an integer'}.get(parse, 'yes or no')))
+
+
 class GitHubConfig(object):
     """ Holds the configuraton values for GitHub API usage.
 
@@ -48,6 +119,27 @@ class GitHubConfig(object):
 
     DEFAULT_URL = 'https://api.github.com'
     NETRC_FILE = None  # use the default, unless changed for test purposes
+    CACHE_DIR = None  # defaults to 'http-cache' in the app's config dir
+    CACHE_ENABLED = True
+    CACHE_TTL = 0  # seconds a cached response is used without revalidation
+    CACHE_MAX_SIZE = httpcache.DEFAULT_MAX_SIZE
+    SNAPSHOT_FILE = None  # defaults to 'snapshots.sqlite' in the app's config dir
+    JOURNAL_DIR = None  # defaults to 'journals' in the app's config dir
+    RATE = None  # sustained requests per second, or only pace when the quota runs low
+    RATE_BURST = 20
+    RATE_RESERVE = 100  # start to stretch the remaining quota when it gets this low
+    RATE_MAX_WAIT = 3900  # seconds; a longer pause lets the request fail
+    POOL_SIZE = 32  # connections kept per host, shared by all threads
+    KEEPALIVE = True  # enable TCP keep-alive probes on pooled connections
+    TIMEOUT = 30.0  # seconds
+    ENGINE = 'threads'  # or 'asyncio'
+    RETRY_ATTEMPTS = 5  # per request, for rate limits and transient failures
+    RETRY_BACKOFF = 1.0  # seconds before the first retry, doubled for each further one
+    RETRY_MAX_DELAY = 30.0
+    RETRY_JITTER = 0.5  # randomly shorten delays by up to this fraction
+    VERBOSE = False
+    PROFILE = None  # a 'util.profiling.RequestProfile' recording all API calls
+    RETRY_COUNTS = Counter()  # retries of the current command, reported in verbose mode
 
 
     def __init__(self, config=None):
@@ -57,18 +149,46 @@ class GitHubConfig(object):
         self.user = None
         self.login_or_token = None
         self.password = None
-        # self.timeout = 10
+        self.timeout = env_setting('GH_API_TIMEOUT', self.TIMEOUT)
+        self.pool_size = env_setting('GH_API_POOL_SIZE', self.POOL_SIZE, int)
+        self.keepalive = env_setting('GH_API_KEEPALIVE', self.KEEPALIVE, parse_bool)
+        self.rate = env_setting('GH_API_RATE', self.RATE) or None  # 0 also means no fixed rate
+        self.retry_attempts = max(env_setting('GH_API_RETRY_ATTEMPTS', self.RETRY_ATTEMPTS, int), 1)
+        self.retry_backoff = env_setting('GH_API_RETRY_BACKOFF', self.RETRY_BACKOFF)
         # client_id – string
         # client_secret – string
+        app_dir = click.get_app_dir(appconfig.APP_NAME or 'gh')
+        self.cache_dir = None
+        if self.CACHE_ENABLED:
+            self.cache_dir = self.CACHE_DIR or os.path.join(app_dir, 'http-cache')
+        self.snapshot_file = self.SNAPSHOT_FILE or os.path.join(app_dir, 'snapshots.sqlite')
+        self.journal_dir = self.JOURNAL_DIR or os.path.join(app_dir, 'journals')
 
         self._get_auth(config)
 
 
+    @property
+    def site(self):
+        """The host name of the GitHub site in use."""
+        return urlparse(self.base_url or self.DEFAULT_URL).hostname
+
     def auth_valid(self):
         """Return bool indicating whether credentials were provided."""
         return bool(self.login_or_token)
 
 
+    def connection_key(self):
+        """ Return the key of API objects for this configuration, in ``api.memo``.
+
+            The options are all settings used by ``install_adapters``,
+            so changing any of them gets a new, differently set up session.
+        """
+        options = (self.timeout, self.pool_size, self.keepalive,
+                   self.rate, self.RATE_BURST, self.RATE_RESERVE, self.RATE_MAX_WAIT,
+                   self.retry_attempts, self.retry_backoff, self.RETRY_MAX_DELAY, self.RETRY_JITTER,
+                   self.cache_dir, self.CACHE_TTL, self.CACHE_MAX_SIZE, self.VERBOSE)
+        return ConnectionKey(self.credentials, options, self.PROFILE)
+
     def _get_auth(self, config):
         """Try to get login auth from either base URL or netrc."""
         auth_url = urlparse(self.base_url or self.DEFAULT_URL)
@@ -79,74 +199,855 @@ class GitHubConfig(object):
         if self.user and self.password:
             self.login_or_token = self.user
         else:
-            self._get_auth_from_netrc(auth_url.hostname)
+            auth = credentials.lookup(self.NETRC_FILE, auth_url.hostname, self.user)
+            if auth:
+                self.user, self.login_or_token, self.password = auth
+        self.credentials = (self.base_url or self.DEFAULT_URL, self.login_or_token, self.password)
+
+
+def netrc_auth(netrc_file, hostname, user=None):
+    """ Try to find login auth for ``hostname`` in ``~/.netrc`` (or ``netrc_file``).
+
+        Returns a ``(user, login_or_token, password)`` tuple, or ``None``.
+    """
+    try:
+        hostauth = netrc(netrc_file)
+    except IOError as cause:
+        if cause.errno != errno.ENOENT:
+            raise
+        return None
+
+    auth = None
+    if user:
+        # Try to find specific `user@host` credentials
+        auth = hostauth.hosts.get(user + '@' + hostname, None)
+    if not auth:
+        auth = hostauth.hosts.get(hostname, None)
+    if not auth:
+        return None
+
+    username, account, password = auth  # pylint: disable=unpacking-non-sequence
+    user = username or user
+    if password == 'token':
+        return user, account, password
+    elif password:
+        return user, user, password
+    return None
+
+
+class CredentialCache(object):
+    """ Credentials read from the netrc file, per host name and user.
+
+        The cache is invalidated when the modification time of the file
+        changes, which is checked at most every ``CHECK_INTERVAL`` seconds,
+        so looking up known credentials does no file I/O at all.
+    """
+
+    CHECK_INTERVAL = 1.0  # seconds
+
+    def __init__(self):
+        self.entries = {}
+        self.checked = {}  # netrc path → (time of check, mtime)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def netrc_path(netrc_file):
+        """Return the path of the netrc file in use."""
+        return netrc_file or os.path.join(os.path.expanduser('~'), '.netrc')
+
+    def mtime(self, path):
+        """Return the (recently checked) modification time of ``path``, or ``None`` if it doesn't exist."""
+        now = time.time()
+        checked, mtime = self.checked.get(path, (None, None))
+        if checked is None or now - checked >= self.CHECK_INTERVAL:
+            try:
+                mtime = os.stat(path).st_mtime
+            except EnvironmentError:
+                mtime = None
+            self.checked[path] = now, mtime
+        return mtime
+
+    def lookup(self, netrc_file, hostname, user=None):
+        """Return the cached result of ``netrc_auth``, reading the file only when it changed."""
+        path = self.netrc_path(netrc_file)
+        key = (path, hostname, user)
+        with self.lock:
+            mtime = self.mtime(path)
+            try:
+                cached_mtime, auth = self.entries[key]
+            except KeyError:
+                pass
+            else:
+                if cached_mtime == mtime:
+                    return auth
+            auth = netrc_auth(netrc_file, hostname, user) if mtime is not None else None
+            self.entries[key] = mtime, auth
+            return auth
+
+    def clear(self):
+        """Forget all credentials."""
+        with self.lock:
+            self.entries.clear()
+            self.checked.clear()
+
+credentials = CredentialCache()  # pylint: disable=invalid-name
+
+
+class RateLimitScheduler(object):
+    """ Pace API requests with a token bucket, and honor GitHub's rate limit headers.
+
+        Requests are only paced when the remaining quota drops below
+        ``reserve``; then the refill rate is set so that the quota lasts
+        until its reset time. A fixed ``rate`` caps the requests per second
+        at all times, while ``None`` leaves a full quota unthrottled. Rate
+        limited responses (``Retry-After`` or an exhausted quota) pause
+        all requests sharing this scheduler, instead of failing.
+
+        See https://developer.github.com/v3/#rate-limiting
+    """
+
+    SECONDARY_LIMIT_DELAY = 60
+
+    def __init__(self, rate=None, burst=20, reserve=100, max_wait=3900, notify=None):
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.notify = notify or (lambda message: None)
+        self.remaining = None
+        self.reset = None
+        self.paused_until = 0
+        self.tokens = float(burst)
+        self.stamp = time.time()
+        self._lock = threading.Lock()
+
+    def _current_rate(self, now):
+        """Return the refill rate, possibly stretched to make the remaining quota last, or ``None`` for no pacing."""
+        if self.remaining is not None and self.reset and self.reset > now and self.remaining < self.reserve:
+            stretched = self.remaining / float(self.reset - now)
+            return max(min(self.rate or stretched, stretched), 1.0 / self.max_wait)
+        return self.rate or None
+
+    def acquire(self):
+        """Block until the next request may be sent."""
+        wait = self.reserve_slot()
+        if wait > 0:
+            time.sleep(wait)
+
+    def reserve_slot(self):
+        """Take the slot of the next request, and return the seconds to wait before sending it."""
+        with self._lock:
+            now = time.time()
+            rate = self._current_rate(now)
+            if rate:
+                self.tokens = min(self.burst, self.tokens + (now - self.stamp) * rate) - 1
+                wait = max(self.paused_until - now, -self.tokens / rate, 0)
+            else:
+                self.tokens = float(self.burst)
+                wait = max(self.paused_until - now, 0)
+            self.stamp = now
+
+        if wait >= 1:
+            self.notify('Pacing API requests, waiting {:.1f} seconds ({} calls remaining)'
+                        .format(wait, '?' if self.remaining is None else self.remaining))
+        return wait
+
+    def update(self, response):
+        """ Record the rate limit headers of a response.
+
+            Returns the delay in seconds before a retry, or ``None`` if the
+            response is to be used as-is.
+        """
+        headers = response.headers
+        now = time.time()
+        with self._lock:
+            try:
+                self.remaining = int(headers['X-RateLimit-Remaining'])
+                self.reset = int(headers['X-RateLimit-Reset'])
+            except (KeyError, ValueError):
+                pass
+            remaining, reset = self.remaining, self.reset
+
+        if response.status_code not in (403, 429):
+            return None
+        if 'Retry-After' in headers:
+            try:
+                delay = float(headers['Retry-After'])
+            except ValueError:
+                delay = self.SECONDARY_LIMIT_DELAY
+        elif remaining == 0 and reset:
+            delay = reset - now + 1
+        elif b'rate limit' in response.content.lower():
+            delay = self.SECONDARY_LIMIT_DELAY
+        else:
+            return None  # a plain permission problem
+
+        if delay > self.max_wait:
+            self.notify('Rate limit exceeded, not waiting {:.0f} seconds for a retry'.format(delay))
+            return None
+
+        delay = max(delay, 1)
+        with self._lock:
+            self.paused_until = max(self.paused_until, now + delay)
+        self.notify('Rate limit exceeded, pausing API requests for {:.0f} seconds'.format(delay))
+        return delay
+
+
+class RetryPolicy(object):
+    """ Decide whether a failed request is repeated, and when – with exponential backoff and jitter.
+
+        Transient failures are connection errors, timeouts, and the
+        ``RETRY_STATUSES`` of overloaded servers or gateways. Requests
+        that might have reached the server are only repeated when
+        that is safe, see ``idempotent``.
+    """
+
+    RETRY_STATUSES = (500, 502, 503, 504)
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE',
+                          'PATCH')  # the PATCH calls of this tool set absolute values
+    LABEL_CREATION = re.compile(r'^(/api/v3)?/repos/[^/]+/[^/]+/labels$')  # POST path
+
+    def __init__(self, attempts=5, backoff=1.0, max_delay=30.0, jitter=0.5, notify=None, counts=None):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.notify = notify or (lambda message: None)
+        self.counts = Counter() if counts is None else counts
+        self._lock = threading.Lock()
+
+    @classmethod
+    def idempotent(cls, method, url, body=None):
+        """ Return whether a request can be repeated without changing its effect.
+
+            Besides the idempotent HTTP methods, GraphQL queries are safe,
+            and so is creating a label – a repeated creation is answered with
+            ``422 already_exists``, see ``SchedulingAdapter.recover_created_label``.
+        """
+        if method in cls.IDEMPOTENT_METHODS:
+            return True
+        if method == 'POST':
+            path = urlparse(url).path.rstrip('/')
+            if cls.creates_label(method, url):
+                return True
+            if path.endswith('/graphql'):
+                if isinstance(body, bytes):
+                    body = body.decode('utf-8', 'replace')
+                try:
+                    query = json.loads(body)['query']
+                except (TypeError, ValueError, KeyError):
+                    return False
+                return not query.lstrip().startswith('mutation')
+        return False
+
+    @classmethod
+    def creates_label(cls, method, url):
+        """Return whether a request creates a repository label."""
+        return method == 'POST' and bool(cls.LABEL_CREATION.match(urlparse(url).path.rstrip('/')))
+
+    def delay(self, attempt, method, url, status=None, error=None, unsent=False, body=None, retry_after=None):
+        """ Return the seconds to wait before repeating a failed request, or ``None`` to give up.
+
+            Pass the response ``status``, or the ``error`` that prevented a response;
+            set ``unsent`` when that error happened before anything was sent.
+            ``attempt`` is the number of the failed attempt.
+        """
+        if error is not None:
+            reason = type(error).__name__
+            if not unsent and not self.idempotent(method, url, body):
+                return None
+        elif status in self.RETRY_STATUSES:
+            reason = 'status {}'.format(status)
+            if not self.idempotent(method, url, body):
+                return None
+        else:
+            return None
+        if attempt >= self.attempts:
+            self.notify('Giving up on {} {} after {} attempts ({})'.format(method, url, attempt, reason))
+            return None
+
+        delay = min(self.max_delay, self.backoff * 2 ** (attempt - 1))
+        delay *= 1 - self.jitter * random.random()
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        with self._lock:
+            self.counts[reason] += 1
+        self.notify('Retrying {} {} in {:.1f} seconds (attempt {}/{}, {})'.format(
+                    method, url, delay, attempt + 1, self.attempts, reason))
+        return delay
+
+    def summary(self):
+        """Return a description of the retries so far."""
+        return describe_retries(self.counts)
+
+
+def describe_retries(counts):
+    """Return a description of the retries in ``counts``, by reason."""
+    return 'Retried {} request(s): {}'.format(sum(counts.values()), ', '.join(
+           '{}× {}'.format(v, k) for k, v in sorted(counts.items())))
+
+
+class SchedulingAdapter(HTTPAdapter):
+    """ Transport adapter that lets a ``RateLimitScheduler`` pace requests, and retries failed ones.
+
+        Rate limited requests are repeated when the scheduler allows,
+        transient failures according to the ``RetryPolicy``. It also applies
+        a default ``timeout``, and optionally enables TCP keep-alive probes
+        for pooled connections.
+    """
+
+    def __init__(self, scheduler, timeout=None, keepalive=False, retry=None, **kwargs):
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.retry = retry or RetryPolicy()
+        super(SchedulingAdapter, self).__init__(**kwargs)
 
+    def init_poolmanager(self, *args, **kwargs):
+        """Add keep-alive socket options to new connections."""
+        if self.keepalive:
+            from requests.packages.urllib3.connection import HTTPConnection
+            kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            ]
+        super(SchedulingAdapter, self).init_poolmanager(*args, **kwargs)
 
-    def _get_auth_from_netrc(self, hostname):
-        """Try to find login auth in ``~/.netrc``."""
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        """Send a request when the scheduler allows it, and repeat it if it fails."""
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        for attempt in range(1, self.retry.attempts + 1):
+            self.scheduler.acquire()
+            try:
+                response = super(SchedulingAdapter, self).send(request, **kwargs)
+            except (ConnectionError, Timeout) as cause:
+                delay = self.retry.delay(attempt, request.method, request.url, error=cause,
+                                         unsent=isinstance(cause, ConnectTimeout), body=request.body)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+
+            if self.scheduler.update(response) is not None and attempt < self.retry.attempts:
+                response.close()  # the scheduler pauses until the rate limit allows another try
+                continue
+
+            delay = self.retry.delay(attempt, request.method, request.url, status=response.status_code,
+                                     body=request.body, retry_after=response.headers.get('Retry-After'))
+            if delay is None:
+                if attempt > 1 and response.status_code == 422 and self.retry.creates_label(request.method, request.url):
+                    response = self.recover_created_label(request, response, **kwargs)
+                return response
+            response.close()
+            time.sleep(delay)
+
+    def recover_created_label(self, request, response, **kwargs):
+        """ Handle a repeated label creation, where an earlier attempt actually succeeded.
+
+            GitHub rejects the repetition as ``already_exists``, so the
+            label is read back, and returned as if it was just created.
+        """
         try:
-            hostauth = netrc(self.NETRC_FILE)
-        except IOError as cause:
-            if cause.errno != errno.ENOENT:
-                raise
-            return
-
-        auth = None
-        if self.user:
-            # Try to find specific `user@host` credentials
-            auth = hostauth.hosts.get(self.user + '@' + hostname, None)
-        if not auth:
-            auth = hostauth.hosts.get(hostname, None)
-
-        if auth:
-            username, account, password = auth  # pylint: disable=unpacking-non-sequence
-            if username:
-                self.user = username
-            if password == 'token':
-                self.login_or_token = account
-                self.password = password
-            elif password:
-                self.login_or_token = self.user
-                self.password = password
+            name = json.loads(request.body)['name']
+            errors = response.json().get('errors') or []
+        except (TypeError, ValueError, KeyError, AttributeError):
+            return response
+        if not any(i.get('code') == 'already_exists' for i in errors):
+            return response
 
+        lookup = request.copy()
+        lookup.prepare_method('GET')
+        lookup.prepare_url(request.url.rstrip('/') + '/' + url_quote(name.encode('utf-8'), safe=''), None)
+        lookup.prepare_body(None, None)
+        label = self.send(lookup, **kwargs)
+        if label.status_code != 200:
+            return response
+        label.status_code = 201
+        return label
 
-def api(config=None):
-    """ Return an authorized GitHub API connection, based on the given configuration.
 
-        See http://jacquev6.net/PyGithub/v1/github.html for more details.
+class CachingSchedulingAdapter(httpcache.CachingAdapter, SchedulingAdapter):
+    """Serve cached responses, and pace those requests that actually hit the network."""
+
+
+def retry_policy(cfg, notify=None):
+    """ Return a ``RetryPolicy`` configured by ``cfg``.
+
+        Retries are counted in ``RETRY_COUNTS``, or in the profile when profiling.
     """
+    profile = getattr(cfg, 'PROFILE', None)
+    return RetryPolicy(attempts=getattr(cfg, 'retry_attempts', GitHubConfig.RETRY_ATTEMPTS),
+                       backoff=getattr(cfg, 'retry_backoff', GitHubConfig.RETRY_BACKOFF),
+                       max_delay=getattr(cfg, 'RETRY_MAX_DELAY', GitHubConfig.RETRY_MAX_DELAY),
+                       jitter=getattr(cfg, 'RETRY_JITTER', GitHubConfig.RETRY_JITTER), notify=notify,
+                       counts=profile.retries if profile else getattr(cfg, 'RETRY_COUNTS', None))
+
+
+def rate_limit_scheduler(cfg, notify=None):
+    """Return a ``RateLimitScheduler`` configured by ``cfg``."""
+    return RateLimitScheduler(rate=getattr(cfg, 'rate', GitHubConfig.RATE),
+                              burst=getattr(cfg, 'RATE_BURST', GitHubConfig.RATE_BURST),
+                              reserve=getattr(cfg, 'RATE_RESERVE', GitHubConfig.RATE_RESERVE),
+                              max_wait=getattr(cfg, 'RATE_MAX_WAIT', GitHubConfig.RATE_MAX_WAIT), notify=notify)
+
+
+def install_adapters(session, cfg):
+    """Mount the transport adapters selected by ``cfg`` into the ``requests`` session."""
+    notify = functools.partial(click.secho, fg='cyan', err=True) if cfg.VERBOSE else None
+    scheduler = rate_limit_scheduler(cfg, notify=notify)
+    retry = retry_policy(cfg, notify=notify)
+    kwargs = dict(scheduler=scheduler, retry=retry, timeout=cfg.timeout, keepalive=cfg.keepalive,
+                  pool_maxsize=cfg.pool_size, pool_block=True)
+
+    if cfg.cache_dir:
+        httpcache.install(session, cfg.cache_dir, ttl=cfg.CACHE_TTL, max_size=cfg.CACHE_MAX_SIZE,
+                          adapter_class=CachingSchedulingAdapter, **kwargs)
+    else:
+        adapter = SchedulingAdapter(**kwargs)
+        for prefix in ('https://', 'http://'):
+            session.mount(prefix, adapter)
+    if cfg.PROFILE:
+        session.hooks['response'].append(cfg.PROFILE.hook)
+
+    return scheduler
+
+
+def resolve_config(config=None):
+    """Return a ``GitHubConfig`` with valid credentials, based on the given configuration."""
     cfg = GitHubConfig(config)
     if not cfg.auth_valid():
         raise dclick.LoggedFailure("Attempt to connect to GitHub API"
                                    " with insufficient credentials! Check your configuration.")
+    return cfg
 
-    api.memo.__dict__.setdefault('conns', {})
-    if None in api.memo.conns:  # Running unit test?
-        key = None
-    else:
-        key = '~'.join([cfg.login_or_token, cfg.password or '', cfg.base_url or cfg.DEFAULT_URL])
 
-    try:
-        apiobj = api.memo.conns[key]
-    except KeyError:
-        if cfg.password == 'token':
-            kwargs = dict(token=cfg.login_or_token)
-        else:
-            kwargs = dict(username=cfg.login_or_token, password=cfg.password)
-        if cfg.base_url:
-            auth_method = enterprise_login
-            kwargs['url'] = cfg.base_url
-        else:
-            auth_method = login
+def api(config=None):
+    """ Return an authorized GitHub API connection, based on the given configuration.
 
-        # print("AUTH", kwargs)
-        apiobj = auth_method(**kwargs)
-        apiobj.gh_config = cfg
-        api.memo.conns[key] = apiobj
+        See http://jacquev6.net/PyGithub/v1/github.html for more details.
+    """
+    cfg = resolve_config(config)
+    key = None if None in api.memo.conns else cfg.connection_key()  # a unit test's mock, or the real thing?
+
+    with api.memo.lock:
+        try:
+            apiobj = api.memo.conns[key]
+        except KeyError:
+            if cfg.password == 'token':
+                kwargs = dict(token=cfg.login_or_token)
+            else:
+                kwargs = dict(username=cfg.login_or_token, password=cfg.password)
+            if cfg.base_url:
+                auth_method = enterprise_login
+                kwargs['url'] = cfg.base_url
+            else:
+                auth_method = login
+
+            # print("AUTH", kwargs)
+            apiobj = auth_method(**kwargs)
+            apiobj.gh_config = cfg
+            apiobj.scheduler = install_adapters(apiobj.session, cfg)
+            api.memo.conns[key] = apiobj
 
     return apiobj
 
-api.memo = threading.local()
+
+class ConnectionMemo(object):
+    """ Process-wide registry of API objects, keyed by credentials and base URL,
+        and the options their sessions were set up with (see ``GitHubConfig.connection_key``).
+
+        All threads share these objects, and thus their connection pools,
+        caches, and rate limit schedulers.
+    """
+
+    def __init__(self):
+        self.conns = {}
+        self.lock = threading.RLock()
+
+    def discard(self, profile):
+        """Forget the API objects recording their calls to ``profile``."""
+        with self.lock:
+            for key in [i for i in self.conns if getattr(i, 'profile', None) is profile]:
+                del self.conns[key]
+
+api.memo = ConnectionMemo()
+
+
+def use_asyncio():
+    """Return bool indicating whether commands should run on the asyncio engine."""
+    return GitHubConfig.ENGINE == 'asyncio'
+
+
+def aio_map(func, items, limit=parallel.DEFAULT_JOBS, config=None):
+    """ Run ``func(client, item)`` coroutines for all ``items`` on the asyncio engine.
+
+        ``client`` is an ``aio.AsyncGitHub`` instance, and at most ``limit``
+        requests are in flight at any time. Returns the results in the order
+        of ``items``. Common runtime errors are reported like in ``open()``.
+    """
+    cfg = resolve_config(config)
+    try:
+        from . import aio
+    except (ImportError, SyntaxError) as cause:
+        raise dclick.LoggedFailure("The asyncio engine needs Python 3.5+ and the 'aiohttp' package ({})"
+                                   .format(cause))
+
+    try:
+        return aio.run(cfg, func, items, limit=limit)
+    except aio.aiohttp.ClientError as cause:
+        raise dclick.LoggedFailure("HTTP connect error ({})".format(cause))
+    except aio.APIError as cause:
+        raise dclick.LoggedFailure("API: {}".format(cause))
+
+
+def page_urls(last_url, limit=None):
+    """Return the URLs of the pages following the first one, up to ``last_url`` (or page ``limit``)."""
+    match = PAGE_NUMBER.search(last_url)
+    if not match:
+        return []
+    last = int(match.group(2))
+    if limit is not None:
+        last = min(last, limit)
+    return [PAGE_NUMBER.sub(r'\g<1>{}'.format(i), last_url, count=1) for i in range(2, last + 1)]
+
+
+class PageIterator(GitHubIterator):
+    """ A ``GitHubIterator`` that fetches the pages of a listing concurrently.
+
+        The first page is requested with the maximal page size. If its ``Link``
+        header names the ``last`` page, all remaining pages are requested with
+        up to ``jobs`` threads, else ``next`` links are followed one by one.
+        Items are yielded in listing order either way, and ``etag`` and
+        ``last_status`` refer to the first page.
+    """
+
+    def __init__(self, count, url, cls, session, params=None, etag=None, headers=None, jobs=PAGE_JOBS):
+        super(PageIterator, self).__init__(count, url, cls, session, params, etag, headers)
+        self.jobs = jobs
+
+    def fetch(self, url):
+        """Return the items of one page, as JSON data."""
+        return self._get_json(self._get(url, headers=self.headers)) or []
+
+    def __iter__(self):
+        params = dict(self.params)
+        params.setdefault('per_page', min(self.count, PAGE_SIZE) if self.count > 0 else PAGE_SIZE)
+        self.params = params
+        cls = self.cls
+        if issubclass(cls, GitHubCore):
+            cls = functools.partial(cls, session=self)
+
+        self.last_url = self.url
+        response = self._get(self.url, params=params, headers=self.headers)
+        self.last_response = response
+        self.last_status = response.status_code
+        self.etag = response.headers.get('ETag')
+        items = self._get_json(response) or []
+        limit = (self.count + params['per_page'] - 1) // params['per_page'] if self.count > 0 else None
+
+        def pages():
+            "Helper"
+            yield items
+            if 'last' in response.links:
+                urls = page_urls(response.links['last']['url'], limit)
+                for page in parallel.ordered_map(self.fetch, urls, min(self.jobs, len(urls))):
+                    yield page
+            else:
+                url = response.links.get('next', {}).get('url')
+                while url:
+                    page_response = self._get(url, headers=self.headers)
+                    yield self._get_json(page_response) or []
+                    url = page_response.links.get('next', {}).get('url')
+
+        for page in pages():
+            for item in page:
+                yield cls(item)
+                self.count -= 1 if self.count > 0 else 0
+                if self.count == 0:
+                    return
+
+
+def iter_pages(core, url, cls, params=None, count=-1, jobs=PAGE_JOBS):
+    """ Return a lazy ``PageIterator`` over the listing at ``url``, with items of type ``cls``.
+
+        ``core`` is the API object or any other ``github3`` object.
+    """
+    return PageIterator(count, url, cls, core, params, jobs=jobs)
+
+
+class RepoHandle(object):
+    """ A repository addressed by name, for label access without a metadata round-trip.
+
+        Labels are read and created via ``/repos/{owner}/{repo}/labels`` directly.
+        Any other attribute is taken from the full ``github3`` repository object,
+        which is only fetched on first use.
+    """
+
+    def __init__(self, api, owner, repo):
+        self.api = api
+        self.owner = owner
+        self.repo = repo
+        self.etag = None
+        self._repository = None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        repository = self.repository()
+        if not repository:
+            raise AttributeError('Non-existing repo "{}/{}" has no attribute "{}"'.format(self.owner, self.repo, name))
+        return getattr(repository, name)
+
+    def repository(self):
+        """Return the full repository object, which is false if the repo does not exist."""
+        if self._repository is None:
+            self._repository = self.api.repository(self.owner, self.repo)
+        return self._repository
+
+    def labels(self):
+        """ Return a list of the repo's ``Label`` objects, or ``None`` if the repo does not exist.
+
+            The ``ETag`` of the listing is kept in ``etag``.
+        """
+        url = self.api._build_url('repos', self.owner, self.repo, 'labels')  # pylint: disable=protected-access
+        iterator = iter_pages(self.api, url, Label)
+        labels = list(iterator)
+        if iterator.last_status == 404:
+            return None
+        self.etag = iterator.etag
+        return labels
+
+    def create_label(self, name, color):
+        """Create a label, and return it as a ``Label`` object, or ``None`` on failure."""
+        api = self.api
+        url = api._build_url('repos', self.owner, self.repo, 'labels')  # pylint: disable=protected-access
+        response = api._post(url, data=dict(name=name, color=color.lstrip('#')))  # pylint: disable=protected-access
+        return api._instance_or_null(Label, api._json(response, 201))  # pylint: disable=protected-access
+
+
+def repo_handle(api, owner, repo):
+    """Return a ``RepoHandle`` for a repository."""
+    return RepoHandle(api, owner, repo)
+
+
+class LabelRecord(object):
+    """ Label data from a batched read, with the ``Label.update`` and ``Label.delete`` methods of ``github3``.
+    """
+
+    def __init__(self, api, owner, repo, name, color):
+        self.session = api.session
+        self.owner = owner
+        self.repo = repo
+        self.name = name
+        self.color = color
+
+    def update(self, name, color):
+        """Update this label via REST, and return a bool indicating success."""
+        url = self.session.build_url('repos', self.owner, self.repo, 'labels',
+                                     url_quote(self.name.encode('utf-8'), safe=''))
+        response = self.session.patch(url, data=json.dumps(dict(name=name, color=color)))
+        if response.status_code != 200:
+            return False
+        self.name, self.color = name, color
+        return True
+
+    def delete(self):
+        """Delete this label via REST, and return a bool indicating success."""
+        url = self.session.build_url('repos', self.owner, self.repo, 'labels',
+                                     url_quote(self.name.encode('utf-8'), safe=''))
+        return self.session.delete(url).status_code in (204, 404)  # 404: a retried call already deleted it
+
+
+def graphql_url(api):
+    """Return the GraphQL endpoint of the host ``api`` is connected to."""
+    base_url = api.session.base_url.rstrip('/')
+    if base_url.endswith('/v3'):  # GitHub Enterprise
+        base_url = base_url[:-3]
+    return base_url + '/graphql'
+
+
+def graphql(api, query, variables=None):
+    """Perform a GraphQL query, and return its ``data`` and ``errors``."""
+    if not getattr(api, 'graphql_supported', True):
+        raise GraphQLError("GraphQL API not available")
+
+    response = api.session.post(graphql_url(api), data=json.dumps(dict(query=query, variables=variables or {})))
+    if response.status_code in (404, 410):
+        api.graphql_supported = False
+    if response.status_code != 200:
+        raise GraphQLError("GraphQL request failed with status {}".format(response.status_code))
+
+    try:
+        result = response.json()
+    except ValueError as cause:
+        raise GraphQLError("Bad GraphQL response ({})".format(cause))
+    return result.get('data') or {}, result.get('errors') or []
+
+
+def batch_labels(api, repos, batch_size=GRAPHQL_BATCH_SIZE, jobs=parallel.DEFAULT_JOBS):
+    """ Read the labels of many repositories with a few GraphQL queries.
+
+        ``repos`` is a list of ``(owner, repo)`` tuples. Returns a dict
+        mapping those to lists of ``LabelRecord`` objects, or to ``None``
+        for non-existing repositories. Raises ``GraphQLError`` when the
+        labels cannot be read that way.
+    """
+    def query(batch):
+        "Helper"
+        variables = {}
+        fields = []
+        params = []
+        for idx, ((owner, repo), cursor) in enumerate(batch):
+            variables.update({'owner{}'.format(idx): owner, 'name{}'.format(idx): repo,
+                              'after{}'.format(idx): cursor})
+            params.append('$owner{0}: String!, $name{0}: String!, $after{0}: String'.format(idx))
+            fields.append(GRAPHQL_LABELS_QUERY.format(idx=idx))
+        data, errors = graphql(api, 'query({}) {{{}\n}}'.format(', '.join(params), ''.join(fields)), variables)
+        if any(i.get('type') != 'NOT_FOUND' for i in errors):
+            raise GraphQLError('; '.join(i.get('message', '?') for i in errors))
+        return [data.get('r{}'.format(idx)) for idx in range(len(batch))]
+
+    result = dict((i, []) for i in repos)
+    pending = [(i, None) for i in result]
+    while pending:
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        replies = parallel.ordered_map(query, batches, jobs=jobs)
+        next_pending = []
+        for batch, reply in zip(batches, replies):
+            for ((owner, repo), _), data in zip(batch, reply):
+                if data is None:
+                    result[owner, repo] = None
+                    continue
+                labels = data['labels']
+                result[owner, repo].extend(LabelRecord(api, owner, repo, i['name'], i['color'])
+                                           for i in labels['nodes'])
+                if labels['pageInfo']['hasNextPage']:
+                    next_pending.append(((owner, repo), labels['pageInfo']['endCursor']))
+        pending = next_pending
+
+    return result
+
+
+def batch_users(api, logins, batch_size=GRAPHQL_BATCH_SIZE, jobs=parallel.DEFAULT_JOBS):
+    """ Read the data of many user accounts with a few GraphQL queries.
+
+        Returns a dict mapping each login to a dict with the same keys
+        as the REST API uses (as far as GraphQL provides them), or to
+        ``None`` for unknown users – note that organizations are not
+        users for GraphQL. Raises ``GraphQLError`` when the users cannot
+        be read that way.
+    """
+    def query(batch):
+        "Helper"
+        variables = dict(('login{}'.format(idx), login) for idx, login in enumerate(batch))
+        params = ', '.join('$login{}: String!'.format(idx) for idx in range(len(batch)))
+        fields = ''.join(GRAPHQL_USER_QUERY.format(idx=idx) for idx in range(len(batch)))
+        data, errors = graphql(api, 'query({}) {{{}\n}}'.format(params, fields), variables)
+        if any(i.get('type') != 'NOT_FOUND' for i in errors):
+            raise GraphQLError('; '.join(i.get('message', '?') for i in errors))
+        return [data.get('u{}'.format(idx)) for idx in range(len(batch))]
+
+    def as_rest(data):
+        "Helper"
+        return None if data is None else dict(
+            login=data['login'], name=data['name'], id=data['databaseId'], type='User',
+            email=data['email'] or None, location=data['location'], html_url=data['url'],
+            created_at=data['createdAt'], updated_at=data['updatedAt'],
+            public_repos=data['repositories']['totalCount'], public_gists=data['gists']['totalCount'],
+            followers=data['followers']['totalCount'], following=data['following']['totalCount'],
+        )
+
+    logins = list(logins)
+    batches = [logins[i:i + batch_size] for i in range(0, len(logins), batch_size)]
+    result = {}
+    for batch, reply in zip(batches, parallel.ordered_map(query, batches, jobs=jobs)):
+        result.update((login, as_rest(data)) for login, data in zip(batch, reply))
+    return result
+
+
+def parse_repo_selector(selector):
+    """ Parse a repository selector into ``(kind, owner, matcher)``, or return ``None`` for a plain name.
+
+        Selectors are ``org:‹name›`` or ``user:‹name›``, optionally followed by ``/‹pattern›``,
+        or ``‹account›/‹pattern›`` where the pattern contains wildcards. Patterns are
+        shell-style globs, or regular expressions when prefixed by a ``~``.
+    """
+    kind = None
+    if ':' in selector.split('/', 1)[0]:
+        kind, selector = selector.split(':', 1)
+        if kind not in REPO_SELECTOR_KINDS:
+            raise dclick.LoggedFailure('Unknown repository selector "{}:", use one of {}.'
+                                       .format(kind, ', '.join(i + ':' for i in REPO_SELECTOR_KINDS)))
+    owner, _, pattern = selector.partition('/')
+    if kind is None and not (owner and (pattern.startswith('~') or any(i in pattern for i in REPO_GLOB_CHARS))):
+        return None
+    if not owner:
+        raise dclick.LoggedFailure('Missing account name in repository selector "{}"!'.format(selector))
+
+    return kind or 'user', owner, name_matcher(pattern) if pattern else lambda name: True
+
+
+def name_matcher(pattern, what='repository'):
+    """ Return a predicate for names matching ``pattern``.
+
+        Patterns are case-insensitive shell-style globs, or regular
+        expressions when prefixed by a ``~``.
+    """
+    if pattern.startswith('~'):
+        try:
+            regex = re.compile(pattern[1:])
+        except re.error as cause:
+            raise dclick.LoggedFailure('Bad {} pattern "{}" ({})'.format(what, pattern[1:], cause))
+        return lambda name: regex.search(name) is not None
+    return lambda name: fnmatch.fnmatchcase(name.lower(), pattern.lower())
+
+
+def iter_repos(api, kind, owner):
+    """ Lazily iterate over the repositories of an organization or user (``kind`` is ``org`` or ``user``).
+
+        The first repositories are available before the complete listing
+        is read, see ``iter_pages``.
+    """
+    # pylint: disable=protected-access
+    if kind == 'org':
+        iterator = iter_pages(api, api._build_url('orgs', owner, 'repos'), Repository)
+    elif owner == api.gh_config.user:
+        iterator = iter_pages(api, api._build_url('user', 'repos'), Repository, params=dict(type='owner'))
+    else:
+        iterator = iter_pages(api, api._build_url('users', owner, 'repos'), Repository)
+
+    for repository in iterator:
+        yield repository
+    if kind == 'org' and iterator.last_status == 404:
+        raise dclick.LoggedFailure('Non-existing organization "{}"!'.format(owner))
+
+
+def select_repos(api, selectors):
+    """ Expand repository selectors (see ``parse_repo_selector``) to a stream of repository names.
+
+        Plain names are passed on unchanged, in their original position.
+        Repeated names are only yielded once.
+    """
+    seen = set()
+    for selector in selectors:
+        parsed = parse_repo_selector(selector)
+        if parsed is None:
+            names = [selector]
+        else:
+            kind, owner, matcher = parsed
+            names = (i.full_name for i in iter_repos(api, kind, owner) if matcher(i.name))
+
+        matched = False
+        for name in names:
+            matched = True
+            if name not in seen:
+                seen.add(name)
+                yield name
+        if not matched:
+            click.secho('WARN No repositories match "{}"'.format(selector), fg='yellow', err=True)
 
 
 @contextmanager
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+""" Local store of label snapshots.
+
+    The labels read from a repository are recorded in an SQLite database
+    in the configuration directory, together with the time they were
+    fetched, and the ``ETag`` of the listing (when known). Commands can
+    then serve fresh snapshots without any API call, and compare label
+    sets of many repositories offline.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import os
+import time
+import sqlite3
+from collections import namedtuple
+
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS repos (
+        site TEXT NOT NULL,
+        owner TEXT NOT NULL,
+        repo TEXT NOT NULL,
+        fetched REAL NOT NULL,
+        etag TEXT,
+        PRIMARY KEY (site, owner, repo)
+    );
+    CREATE TABLE IF NOT EXISTS labels (
+        site TEXT NOT NULL,
+        owner TEXT NOT NULL,
+        repo TEXT NOT NULL,
+        name TEXT NOT NULL,
+        color TEXT NOT NULL,
+        PRIMARY KEY (site, owner, repo, name)
+    );
+"""
+
+Label = namedtuple('Label', 'name color')
+Snapshot = namedtuple('Snapshot', 'owner repo fetched etag labels')
+
+
+class SnapshotStore(object):
+    """ Label snapshots of the repositories on one GitHub ``site`` (a host name).
+
+        The store must only be used by the thread that created it, but
+        several stores can share one database file, e.g. in parallel
+        batch jobs. Writers wait up to ``TIMEOUT`` seconds for each other.
+    """
+    TIMEOUT = 60.0
+
+    def __init__(self, site, path):
+        self.site = site
+        self.path = path
+        if not os.path.isdir(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path))
+        self.db = sqlite3.connect(self.path, timeout=self.TIMEOUT)  # pylint: disable=invalid-name
+        self.db.execute('PRAGMA journal_mode=WAL')  # readers don't block writers
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, owner, repo, max_age=None):
+        """ Return the ``Snapshot`` of a repository, or ``None``.
+
+            With a ``max_age`` in seconds, older snapshots are ignored.
+        """
+        row = self.db.execute('SELECT fetched, etag FROM repos WHERE site=? AND owner=? AND repo=?',
+                              (self.site, owner, repo)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[0] > max_age):
+            return None
+        labels = self.db.execute('SELECT name, color FROM labels WHERE site=? AND owner=? AND repo=? ORDER BY name',
+                                 (self.site, owner, repo)).fetchall()
+        return Snapshot(owner, repo, row[0], row[1], [Label(*i) for i in labels])
+
+    def put(self, owner, repo, labels, etag=None, fetched=None):
+        """Record the current ``labels`` (``(name, color)`` pairs) of a repository."""
+        key = (self.site, owner, repo)
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO repos VALUES (?, ?, ?, ?, ?)',
+                            key + (fetched or time.time(), etag))
+            self.db.execute('DELETE FROM labels WHERE site=? AND owner=? AND repo=?', key)
+            self.db.executemany('INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?)',
+                                [key + (name, color.lstrip('#')) for name, color in labels])
+
+    def drop(self, owner, repo):
+        """Forget the snapshot of a repository, e.g. after changing its labels."""
+        key = (self.site, owner, repo)
+        with self.db:
+            self.db.execute('DELETE FROM repos WHERE site=? AND owner=? AND repo=?', key)
+            self.db.execute('DELETE FROM labels WHERE site=? AND owner=? AND repo=?', key)
+
+    def names(self):
+        """Return the sorted ``owner/repo`` names of all recorded repositories."""
+        return ['{}/{}'.format(*i) for i in self.db.execute(
+                'SELECT owner, repo FROM repos WHERE site=? ORDER BY owner, repo', (self.site,))]
@@ -17,6 +17,8 @@
 # limitations under the License.
 from __future__ import absolute_import, unicode_literals, print_function
 
+from importlib import import_module
+
 import click
 
 
@@ -50,3 +52,44 @@ class AliasedGroup(click.Group):
         """Map some aliases to their 'real' names."""
         cmd_name = self.MAP.get(cmd_name, cmd_name)
         return click.Group.get_command(self, ctx, cmd_name)
+
+
+class LazyGroup(click.Group):
+    """ A command group that imports the modules defining its sub-commands on demand.
+
+        Register sub-commands via ``add_lazy_command``; the given module must
+        add a command of that name to this group when it is imported. So
+        calling ``--help`` or a single command does not pay for importing
+        all the others, and their dependencies.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.lazy_commands = {}
+        click.Group.__init__(self, *args, **kwargs)
+
+    def add_lazy_command(self, name, module_name, short_help=''):
+        """Register command ``name`` as defined in the module ``module_name``."""
+        self.lazy_commands[name] = (module_name, short_help)
+
+    def list_commands(self, ctx):
+        """Return names of loaded and lazy commands."""
+        return sorted(set(self.commands) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        """Import the module of a lazy command on first access."""
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            import_module(self.lazy_commands[cmd_name][0])
+        return click.Group.get_command(self, ctx, cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        """List commands with their short help, without loading lazy ones."""
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                rows.append((name, self.commands[name].short_help or ''))
+            else:
+                rows.append((name, self.lazy_commands[name][1]))
+
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+""" Persistent HTTP response cache with conditional revalidation.
+
+    Successful ``GET`` responses carrying an ``ETag`` or ``Last-Modified``
+    validator are stored on disk, and later requests for the same URL
+    (and the same credentials) are sent with ``If-None-Match`` resp.
+    ``If-Modified-Since`` headers. A ``304 Not Modified`` answer then
+    is served from the cache – and GitHub does not count those against
+    the rate limit.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import os
+import json
+import time
+import base64
+import hashlib
+import tempfile
+import threading
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+DEFAULT_MAX_SIZE = 50 * 1024 * 1024
+UNCACHED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'set-cookie', 'connection')
+
+
+class HTTPCache(object):
+    """ A size-bounded directory of cached responses, evicted in LRU order.
+
+        Each entry is a JSON file named after a hash of the request's
+        identity; its modification time records the last access.
+    """
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request):
+        """Return the cache key for a prepared request (URL, auth identity, and content type)."""
+        parts = [request.method, request.url] + [request.headers.get(i, '') for i in ('Accept', 'Authorization')]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def _filename(self, key):
+        "Helper"
+        return os.path.join(self.path, key[:2], key + '.json')
+
+    def get(self, key):
+        """Return the entry stored under ``key``, or ``None``."""
+        filename = self._filename(key)
+        try:
+            with open(filename, 'rb') as handle:
+                entry = json.loads(handle.read().decode('utf-8'))
+            os.utime(filename, None)
+        except (EnvironmentError, ValueError):
+            return None
+        return entry
+
+    def put(self, key, entry):
+        """Store ``entry`` under ``key``, evicting old entries as needed."""
+        filename = self._filename(key)
+        data = json.dumps(entry, sort_keys=True).encode('utf-8')
+        try:
+            if not os.path.isdir(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            handle, tmpname = tempfile.mkstemp(dir=os.path.dirname(filename), suffix='.tmp')
+            with os.fdopen(handle, 'wb') as tmpfile:
+                tmpfile.write(data)
+            try:
+                replaced = os.path.getsize(filename)
+            except EnvironmentError:
+                replaced = 0  # a new entry
+            os.rename(tmpname, filename)
+        except EnvironmentError:
+            return  # caching is just an optimization
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(os.path.getsize(i) for _, i in self._entries())
+            else:
+                self._size += len(data) - replaced
+            if self._size > self.max_size:
+                self._evict()
+
+    def _entries(self):
+        "Helper yielding ``(mtime, filename)`` of all entries."
+        for dirpath, _, filenames in os.walk(self.path):
+            for name in filenames:
+                if name.endswith('.json'):
+                    filename = os.path.join(dirpath, name)
+                    try:
+                        yield os.path.getmtime(filename), filename
+                    except EnvironmentError:
+                        pass  # concurrently evicted
+
+    def _evict(self):
+        """Remove least recently used entries, until the cache fills 90% of its maximum size."""
+        self._size = 0
+        full = False
+        for _, filename in sorted(self._entries(), reverse=True):
+            try:
+                size = os.path.getsize(filename)
+                full = full or self._size + size > self.max_size * 0.9
+                if full:
+                    os.remove(filename)
+                else:
+                    self._size += size
+            except EnvironmentError:
+                pass  # concurrently evicted
+
+
+class CachingAdapter(HTTPAdapter):
+    """ Transport adapter that revalidates cached ``GET`` responses.
+
+        Entries younger than ``ttl`` seconds are served without any
+        network access at all. Responses served from the cache have
+        a ``from_cache`` attribute set to ``True``.
+    """
+
+    def __init__(self, cache, ttl=0, **kwargs):
+        self.cache = cache
+        self.ttl = ttl
+        super(CachingAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        """Send a request, using cached data where possible."""
+        if request.method != 'GET':
+            return super(CachingAdapter, self).send(request, **kwargs)
+
+        key = self.cache.key(request)
+        entry = self.cache.get(key)
+        if entry:
+            if self.ttl and time.time() - entry['stored'] < self.ttl:
+                return self._cached_response(request, entry)
+            if entry.get('etag'):
+                request.headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super(CachingAdapter, self).send(request, **kwargs)
+        response.from_cache = False
+
+        if entry and response.status_code == 304:
+            # Keep the fresh rate limit & paging headers
+            entry['headers'].update((k, v) for k, v in response.headers.items()
+                                    if k.lower() not in UNCACHED_HEADERS)
+            entry['stored'] = time.time()
+            self.cache.put(key, entry)
+            response.close()
+            return self._cached_response(request, entry)
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code == 200 and (etag or last_modified):
+            self.cache.put(key, dict(
+                url=response.url,
+                stored=time.time(),
+                etag=etag,
+                last_modified=last_modified,
+                headers=dict((k, v) for k, v in response.headers.items() if k.lower() not in UNCACHED_HEADERS),
+                body=base64.b64encode(response.content).decode('ascii'),
+            ))
+
+        return response
+
+    @staticmethod
+    def _cached_response(request, entry):
+        """Build a response object out of a cache entry."""
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = entry['url']
+        response.request = request
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = base64.b64decode(entry['body'].encode('ascii'))  # pylint: disable=protected-access
+        response.from_cache = True
+        return response
+
+
+def install(session, path, ttl=0, max_size=DEFAULT_MAX_SIZE, adapter_class=CachingAdapter, **kwargs):
+    """ Mount a caching adapter backed by the directory ``path`` into a ``requests`` session.
+
+        Additional keyword arguments are passed to the ``adapter_class``,
+        which can combine ``CachingAdapter`` with other adapter mix-ins.
+    """
+    adapter = adapter_class(HTTPCache(path, max_size=max_size), ttl=ttl, **kwargs)
+    for prefix in ('https://', 'http://'):
+        session.mount(prefix, adapter)
+    return adapter
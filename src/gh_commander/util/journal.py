@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+""" Append-only journals for resumable bulk operations.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import io
+import os
+import json
+import hashlib
+import threading
+
+
+STARTED = 'started'
+DONE = 'done'
+
+
+def journal_key(header):
+    """Return a file name stem identifying the operation described by ``header``."""
+    return hashlib.sha256(json.dumps(header, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class Journal(object):
+    """ A JSON lines file recording the state of each item of a bulk operation.
+
+        The first line holds the ``header`` describing the operation, every
+        other line a state change of one item (with optional extra data).
+        When ``resume`` is set and a journal for the same operation exists,
+        its states are loaded, else a new journal is started.
+    """
+
+    def __init__(self, path, header, resume=False):
+        self.path = path
+        self.states = {}
+        self.resumed = False
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            self.resumed = self._load(header)
+        if not self.resumed:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with io.open(path, 'w', encoding='utf-8') as handle:
+                handle.write(json.dumps(header, sort_keys=True) + '\n')
+        self._handle = io.open(path, 'a', encoding='utf-8')
+
+    def _load(self, header):
+        """Load the item states, and return whether the journal matches ``header``."""
+        with io.open(self.path, encoding='utf-8') as handle:
+            lines = handle.read().splitlines()
+        try:
+            if not lines or json.loads(lines[0]) != header:
+                return False
+        except ValueError:
+            return False
+
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # a partially written last line
+            self.states[entry['key']] = entry['state']
+        return True
+
+    def keys(self, state):
+        """Return the set of item keys currently in ``state``."""
+        with self._lock:
+            return set(k for k, v in self.states.items() if v == state)
+
+    def record(self, key, state, **data):
+        """Append a state change of item ``key``."""
+        data.update(key=key, state=state)
+        with self._lock:
+            self._handle.write(json.dumps(data, sort_keys=True) + '\n')
+            self._handle.flush()
+            self.states[key] = state
+
+    def close(self):
+        """Close the journal file."""
+        self._handle.close()
+
+    def remove(self):
+        """Close and delete the journal, after the operation completed."""
+        self.close()
+        os.remove(self.path)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+""" Concurrency helpers for latency-bound API work.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import sys
+import threading
+from itertools import islice
+from collections import deque
+from contextlib import closing, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+from .._compat import queue, reraise
+
+
+DEFAULT_JOBS = 4
+
+
+def jobs_option(*param_decls, **attrs):
+    """``--jobs`` option that sets the number of concurrent workers."""
+    attrs.setdefault('default', DEFAULT_JOBS)
+    attrs.setdefault('type', click.IntRange(1))
+    attrs.setdefault('show_default', True)
+    attrs.setdefault('help', 'Number of concurrent API workers.')
+    return click.option(*(param_decls or ('-j', '--jobs')), **attrs)
+
+
+@contextmanager
+def pool(jobs):
+    """ Context manager providing a thread pool for ``jobs`` workers.
+
+        For a single job, ``None`` is provided, which makes ``ordered_map``
+        run everything in the calling thread.
+    """
+    if jobs <= 1:
+        yield None
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            yield executor
+
+
+def ordered_map(func, iterable, jobs=DEFAULT_JOBS, executor=None):
+    """ Call ``func`` for each item of ``iterable``, using up to ``jobs`` threads.
+
+        Results are yielded in input order, as soon as they and all their
+        predecessors are available. Only a bounded number of calls is in
+        flight at any time, so ``iterable`` may be a lazy stream.
+
+        Pass an ``executor`` to share a pool between several calls,
+        otherwise a private one is created on demand. When the consumer
+        stops early (closes the generator), calls not yet started are
+        cancelled.
+    """
+    if executor is None:
+        if jobs <= 1:
+            for item in iterable:
+                yield func(item)
+            return
+
+        with pool(jobs) as executor:
+            with closing(ordered_map(func, iterable, jobs, executor)) as results:
+                for result in results:
+                    yield result
+        return
+
+    pending = deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` consecutive items of ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def readahead(iterable, size=100):
+    """ Consume ``iterable`` in a background thread, buffering up to ``size`` items.
+
+        This lets a slow producer (like a paginated listing) make progress
+        while the consumer works on already delivered items. Exceptions of
+        the producer are re-raised in the consumer. When the consumer stops
+        early, the producer stops too, after the item it is working on.
+    """
+    buffered = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+    done = object()
+
+    def put(entry):
+        "Helper"
+        while not stopped.is_set():
+            try:
+                buffered.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        "Helper"
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception:  # pylint: disable=broad-except
+            put((done, sys.exc_info()))
+        else:
+            put((done, None))
+
+    producer = threading.Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+    try:
+        while True:
+            item, exc_info = buffered.get()
+            if item is done:
+                if exc_info:
+                    reraise(*exc_info)
+                return
+            yield item
+    finally:
+        stopped.set()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+""" Request-level instrumentation of API calls.
+
+    A ``RequestProfile`` collects per-endpoint request counts, latencies,
+    transferred bytes, cache hits, and rate limit consumption. It is fed by
+    the ``requests`` response hook ``RequestProfile.hook``, or by calling
+    ``record`` directly, and can be reported as text or as JSON.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import io
+import re
+import json
+import math
+import time
+import threading
+from collections import Counter, OrderedDict
+
+from .._compat import urlparse
+
+
+# Path prefixes of the API on GitHub Enterprise, and URL parts replaced by placeholders
+API_PREFIXES = ('/api/v3', '/api')
+ENDPOINT_PATTERNS = [
+    (re.compile(r'^/repos/[^/]+/[^/]+'), '/repos/{owner}/{repo}'),
+    (re.compile(r'^/(users|orgs)/[^/]+'), r'/\1/{login}'),
+    (re.compile(r'/labels/[^/]+$'), '/labels/{name}'),
+]
+
+
+def endpoint(method, url):
+    """Return the endpoint of a call, i.e. its method and templated path, like ``GET /repos/{owner}/{repo}``."""
+    path = urlparse(url).path.rstrip('/') or '/'
+    for prefix in API_PREFIXES:
+        if path.startswith(prefix + '/'):
+            path = path[len(prefix):]
+            break
+    for pattern, replacement in ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path)
+    return '{} {}'.format(method, path)
+
+
+def percentile(values, fraction):
+    """Return the ``fraction`` percentile of sorted ``values`` (nearest rank)."""
+    if not values:
+        return 0.0
+    return values[min(len(values), max(1, int(math.ceil(fraction * len(values))))) - 1]
+
+
+class RequestProfile(object):
+    """ Thread-safe collector of request measurements, per endpoint."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.calls = {}
+        self.rate_limit = None
+        self.rate_first = None
+        self.rate_last = None
+        self.retries = Counter()  # shared with the retry policies
+        self._lock = threading.Lock()
+
+    def record(self, method, url, status, seconds, sent=0, received=0, from_cache=False, headers=None):
+        """Record one API call; ``headers`` are the response headers, for rate limit tracking."""
+        name = endpoint(method, url)
+        with self._lock:
+            stats = self.calls.setdefault(name, dict(latencies=[], statuses={}, sent=0, received=0, cached=0))
+            stats['latencies'].append(seconds)
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+            stats['sent'] += sent
+            stats['received'] += received
+            stats['cached'] += bool(from_cache)
+
+            if headers and not from_cache and 'X-RateLimit-Remaining' in headers:
+                try:
+                    remaining = int(headers['X-RateLimit-Remaining'])
+                    self.rate_limit = int(headers.get('X-RateLimit-Limit', self.rate_limit or 0)) or None
+                except ValueError:
+                    return
+                if self.rate_first is None:
+                    self.rate_first = remaining + 1  # the quota before this call
+                self.rate_last = remaining if self.rate_last is None else min(self.rate_last, remaining)
+
+    def hook(self, response, *args, **kwargs):  # pylint: disable=unused-argument
+        """Response hook for a ``requests`` session."""
+        request = response.request
+        body = request.body or b''
+        received = response.headers.get('Content-Length')
+        if received is None or getattr(response, 'from_cache', False):
+            received = 0 if kwargs.get('stream') else len(response.content or b'')
+        self.record(request.method, request.url, response.status_code,
+                    seconds=response.elapsed.total_seconds(),
+                    sent=len(body),
+                    received=int(received),
+                    from_cache=getattr(response, 'from_cache', False),
+                    headers=response.headers)
+        return response
+
+    def summary(self):
+        """Return the collected data as a JSON-serializable dict."""
+        with self._lock:
+            endpoints = OrderedDict()
+            for name, stats in sorted(self.calls.items(), key=lambda i: -sum(i[1]['latencies'])):
+                latencies = sorted(stats['latencies'])
+                endpoints[name] = OrderedDict([
+                    ('count', len(latencies)),
+                    ('cached', stats['cached']),
+                    ('statuses', dict((str(k), v) for k, v in sorted(stats['statuses'].items()))),
+                    ('total', round(sum(latencies), 4)),
+                    ('p50', round(percentile(latencies, 0.5), 4)),
+                    ('p95', round(percentile(latencies, 0.95), 4)),
+                    ('max', round(latencies[-1], 4)),
+                    ('sent', stats['sent']),
+                    ('received', stats['received']),
+                ])
+            rate_used = None if self.rate_first is None else self.rate_first - self.rate_last
+            return OrderedDict([
+                ('elapsed', round(time.time() - self.started, 4)),
+                ('requests', sum(i['count'] for i in endpoints.values())),
+                ('cached', sum(i['cached'] for i in endpoints.values())),
+                ('sent', sum(i['sent'] for i in endpoints.values())),
+                ('received', sum(i['received'] for i in endpoints.values())),
+                ('rate_limit', OrderedDict([
+                    ('limit', self.rate_limit), ('used', rate_used), ('remaining', self.rate_last),
+                ])),
+                ('retries', dict(self.retries)),
+                ('endpoints', endpoints),
+            ])
+
+    def dump(self, filename):
+        """Write the collected data as JSON to ``filename``."""
+        with io.open(filename, 'w', encoding='utf-8') as handle:
+            handle.write(json.dumps(self.summary(), indent=2, ensure_ascii=False) + '\n')
+
+    def report(self):
+        """Return the collected data as a list of text lines."""
+        summary = self.summary()
+        lines = ['{:48s} {:>6s} {:>6s} {:>8s} {:>8s} {:>8s} {:>8s} {:>10s}'.format(
+                 'Endpoint', 'Calls', 'Cached', 'Total', 'p50', 'p95', 'Max', 'Bytes')]
+        for name, stats in summary['endpoints'].items():
+            lines.append('{:48s} {:6d} {:6d} {:7.3f}s {:7.3f}s {:7.3f}s {:7.3f}s {:10d}'.format(
+                         name, stats['count'], stats['cached'], stats['total'],
+                         stats['p50'], stats['p95'], stats['max'], stats['sent'] + stats['received']))
+        lines.append('{} request(s), {} from cache, {} bytes sent, {} bytes received in {:.3f}s'.format(
+                     summary['requests'], summary['cached'], summary['sent'], summary['received'],
+                     summary['elapsed']))
+        rate = summary['rate_limit']
+        if rate['used'] is not None:
+            lines.append('Rate limit: {} call(s) used, {} of {} remaining'.format(
+                         rate['used'], rate['remaining'], rate['limit'] or '?'))
+        if summary['retries']:
+            lines.append('Retries: ' + ', '.join('{}× {}'.format(v, k) for k, v in sorted(summary['retries'].items())))
+        return lines
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+""" Streaming writers for tabular data.
+
+    In contrast to a ``tablib.Dataset``, these write rows to a binary
+    stream as they arrive, so memory use does not depend on the amount
+    of data. Their output is the same as that of the ``tablib`` formats
+    of the same name; ``jsonl`` writes one JSON object per line.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import csv
+import json
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+
+from .._compat import PY2, BytesIO, StringIO, text_type, with_metaclass
+
+
+class RowWriter(with_metaclass(ABCMeta, object)):
+    """ Base class of streaming writers, used as a context manager.
+
+        ``headers`` are the column names, ``write_rows`` appends
+        a batch of row tuples, and leaving the context terminates
+        the output – also after an error, so that what was written
+        so far is still well-formed.
+    """
+
+    def __init__(self, stream, headers):
+        self.stream = stream
+        self.headers = tuple(headers)
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_rows(self, rows):
+        """Write a batch of rows, and flush the stream."""
+        rows = list(rows)
+        if not rows:
+            return
+        text = self.format_rows(rows, first=not self.count)
+        self.count += len(rows)
+        self.write(text)
+
+    def write(self, text):
+        """Write serialized data, and flush the stream."""
+        self.stream.write(text.encode('utf-8') if isinstance(text, text_type) else text)
+        self.stream.flush()
+
+    def close(self):
+        """Terminate the output, which must be well-formed also without any rows."""
+
+    @abstractmethod
+    def format_rows(self, rows, first=False):
+        """Return the serialized ``rows``; ``first`` is set for the first batch."""
+
+    def dicts(self, rows):
+        "Helper"
+        return [OrderedDict(zip(self.headers, row)) for row in rows]
+
+
+class CsvWriter(RowWriter):
+    """Writer for CSV and TSV data, starting with a header line."""
+
+    def __init__(self, stream, headers, delimiter=','):
+        super(CsvWriter, self).__init__(stream, headers)
+        self.delimiter = delimiter
+
+    def format_rows(self, rows, first=False):
+        if first:
+            rows = [self.headers] + rows
+        if PY2:
+            buf = BytesIO()
+            rows = [[i.encode('utf-8') if isinstance(i, text_type) else i for i in row] for row in rows]
+            csv.writer(buf, delimiter=self.delimiter.encode('ascii')).writerows(rows)
+        else:
+            buf = StringIO()
+            csv.writer(buf, delimiter=self.delimiter).writerows(rows)
+        return buf.getvalue()
+
+    def close(self):
+        if not self.count:
+            self.write(self.format_rows([], first=True))
+
+
+class JsonWriter(RowWriter):
+    """Writer for a JSON list of objects, terminated by a newline."""
+
+    def format_rows(self, rows, first=False):
+        text = ', '.join(json.dumps(i) for i in self.dicts(rows))
+        return ('[' if first else ', ') + text
+
+    def close(self):
+        self.write(']\n' if self.count else '[]\n')
+
+
+class JsonLinesWriter(RowWriter):
+    """Writer for JSON lines, i.e. one object per line."""
+
+    def format_rows(self, rows, first=False):
+        return ''.join(json.dumps(i) + '\n' for i in self.dicts(rows))
+
+
+class YamlWriter(RowWriter):
+    """Writer for a YAML list of objects in flow style."""
+
+    def format_rows(self, rows, first=False):
+        import yaml
+
+        return yaml.safe_dump([dict(zip(self.headers, row)) for row in rows], default_flow_style=None)
+
+    def close(self):
+        if not self.count:
+            self.write('[]\n')
+
+
+WRITERS = OrderedDict([
+    ('csv', CsvWriter),
+    ('tsv', lambda stream, headers: CsvWriter(stream, headers, delimiter='\t')),
+    ('json', JsonWriter),
+    ('jsonl', JsonLinesWriter),
+    ('yaml', YamlWriter),
+])
+
+
+def writer(serializer, stream, headers):
+    """Return a streaming writer for the ``serializer`` format (one of ``WRITERS``)."""
+    return WRITERS[serializer](stream, headers)
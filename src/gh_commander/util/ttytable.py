@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+""" Streaming renderer of text tables for terminals.
+
+    Column widths are taken from the header and a bounded number of
+    leading rows, so the first lines are printed before all rows are
+    known, and memory use does not depend on the number of rows. Cells
+    wider than their column, and tables wider than the terminal, are
+    truncated with an ellipsis.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import sys
+import unicodedata
+from itertools import chain, islice
+
+import click
+
+from .._compat import text_type
+
+
+LOOKAHEAD = 200  # rows used to determine the column widths
+MIN_WIDTH = 3  # of a shrunk column
+ELLIPSIS = '…'
+PADDING = 1  # blanks on each side of a cell
+
+# Box drawing characters: (left, horizontal, column separator, right) per line kind
+BORDER_TOP = ('┌', '─', '┬', '┐')
+BORDER_MIDDLE = ('├', '─', '┼', '┤')
+BORDER_BOTTOM = ('└', '─', '┴', '┘')
+ROW = ('│', ' ', '│', '│')
+
+
+def char_width(char):
+    """Return the number of terminal cells taken by ``char``."""
+    if unicodedata.combining(char):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in 'WF' else 1
+
+
+def text_width(text):
+    """Return the number of terminal cells taken by ``text``."""
+    if all(ord(i) < 0x300 for i in text):
+        return len(text)  # the common case, without any wide or combining characters
+    return sum(char_width(i) for i in text)
+
+
+def truncate(text, width):
+    """Cut ``text`` down to ``width`` cells, marking any cut with an ellipsis."""
+    if text_width(text) <= width:
+        return text
+    result, used = [], 0
+    for char in text:
+        used += char_width(char)
+        if used > width - 1:
+            break
+        result.append(char)
+    return ''.join(result) + ELLIPSIS
+
+
+def pad(text, width):
+    """Left-align ``text`` in a field of ``width`` cells."""
+    text = truncate(text, width)
+    return text + ' ' * (width - text_width(text))
+
+
+def terminal_width(stream=None):
+    """Return the width of the terminal ``stream`` (default: ``stdout``) writes to, or ``None``."""
+    stream = stream or sys.stdout
+    try:
+        if not stream.isatty():
+            return None
+    except (AttributeError, ValueError):
+        return None
+    return click.get_terminal_size()[0] or None
+
+
+def fit_widths(widths, max_width):
+    """ Return column ``widths`` reduced so that the table fits into ``max_width`` cells.
+
+        The widest columns are shrunk first, but not below ``MIN_WIDTH``.
+    """
+    widths = list(widths)
+    overhead = len(widths) * (2 * PADDING + 1) + 1
+    excess = sum(widths) + overhead - max_width
+    while excess > 0:
+        widest = max(range(len(widths)), key=lambda i: widths[i])
+        if widths[widest] <= MIN_WIDTH:
+            break
+        others = widths[:widest] + widths[widest + 1:]
+        step = min(excess, max(widths[widest] - max(others + [MIN_WIDTH]), 1))
+        widths[widest] -= step
+        excess -= step
+    return widths
+
+
+def border(widths, chars):
+    """Return a horizontal line of the table."""
+    left, line, sep, right = chars
+    return left + sep.join(line * (i + 2 * PADDING) for i in widths) + right
+
+
+def table_lines(headers, rows, max_width=None, styles=None, lookahead=LOOKAHEAD):
+    """ Yield the lines of a table with ``headers``, and the cells of ``rows``.
+
+        ``rows`` can be any iterable; only the first ``lookahead`` rows are
+        read before the first line is yielded. With ``max_width``, lines are
+        not wider than that. ``styles`` is a list of ``click.style`` keyword
+        dicts (or ``None``), per column.
+    """
+    rows = iter(rows)
+    head = [tuple(text_type(i) for i in row) for row in islice(rows, lookahead)]
+    widths = [max([text_width(text_type(header))] + [text_width(row[idx]) for row in head])
+              for idx, header in enumerate(headers)]
+    if max_width:
+        widths = fit_widths(widths, max_width)
+    styles = styles or [None] * len(widths)
+    left, _, sep, right = ROW
+    blank = ' ' * PADDING
+
+    def line(cells, use_styles=True):
+        "Helper"
+        texts = [pad(text_type(cell), width) for cell, width in zip(cells, widths)]
+        if use_styles:
+            texts = [click.style(text, **style) if style else text for text, style in zip(texts, styles)]
+        return left + sep.join(blank + text + blank for text in texts) + right
+
+    yield border(widths, BORDER_TOP)
+    yield line(headers, use_styles=False)
+    yield border(widths, BORDER_MIDDLE)
+    for row in chain(head, rows):
+        yield line(row)
+    yield border(widths, BORDER_BOTTOM)
+
+
+def echo_table(headers, rows, styles=None, lookahead=LOOKAHEAD):
+    """Print a table to ``stdout`` while its rows arrive, fitted to the terminal width."""
+    for text in table_lines(headers, rows, max_width=terminal_width(), styles=styles, lookahead=lookahead):
+        click.echo(text)
@@ -0,0 +1,204 @@
+# *- coding: utf-8 -*-
+# pylint: disable=missing-docstring, bad-continuation
+""" Benchmarks of ``gh`` commands against a local fake GitHub server.
+
+    Measures start-up time, and the wall clock time and request counts
+    of ``label list``, ``label export``, and ``label import``, running
+    the real command line in sub-processes. Results are written as JSON,
+    and can be compared to an earlier run to detect regressions. Requests
+    are paced like in a default installation, unless ``--rate`` is given::
+
+        python src/tests/benchmark.py --repos 1000 --labels 50 --latency 0.01
+        python src/tests/benchmark.py --compare build/benchmarks/baseline.json
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fakehub import FakeHub  # noqa pylint: disable=wrong-import-position
+
+
+DEFAULT_OUTPUT_DIR = os.path.join('build', 'benchmarks')
+DEFAULT_TOLERANCE = 0.2
+
+
+class Bench(object):
+    """ Runs ``gh`` against a ``FakeHub`` and collects the measurements.
+
+        Each command runs with a fresh configuration directory,
+        i.e. with a cold HTTP cache.
+    """
+
+    def __init__(self, server, workdir, jobs, engine='threads', rounds=3, rate=None):
+        self.server = server
+        self.rate = rate
+        self.workdir = workdir
+        self.jobs = jobs
+        self.engine = engine
+        self.rounds = rounds
+        self.results = {}
+
+    def env(self):
+        env = dict(os.environ)
+        env.update(
+            GH_API_BASE_URL=self.server.base_url,
+            XDG_CONFIG_HOME=tempfile.mkdtemp(dir=self.workdir),
+            HOME=self.workdir,
+        )
+        if self.rate:
+            env['GH_API_RATE'] = str(self.rate)
+        return env
+
+    def gh(self, *args):
+        cmd = [sys.executable, '-m', 'gh_commander', '--engine', self.engine] + list(args)
+        output = subprocess.check_output(cmd, env=self.env(), stderr=subprocess.STDOUT)
+        return output.decode('utf-8', 'replace')
+
+    def measure(self, name, *args):
+        """Run ``gh *args``, and record the best time out of ``rounds`` runs, plus request counts."""
+        timings = []
+        for _ in range(self.rounds):
+            self.server.reset_counts()
+            started = time.time()
+            self.gh(*args)
+            timings.append(time.time() - started)
+        requests = dict(self.server.requests)
+        self.results[name] = dict(
+            seconds=round(min(timings), 4),
+            median=round(sorted(timings)[len(timings) // 2], 4),
+            requests=requests,
+            total_requests=sum(requests.values()),
+        )
+        return self.results[name]
+
+    def run(self, repos):
+        repo_args = list(repos)
+        jobs = ['--jobs', str(self.jobs)]
+        export_file = os.path.join(self.workdir, 'labels.json')
+        import_file = os.path.join(self.workdir, 'import.json')
+
+        self.measure('startup', '--help')
+        self.measure('label_list', 'label', 'list', *(jobs + repo_args))
+        self.measure('label_export', 'label', 'export', *(jobs + repo_args + [export_file]))
+
+        # Import a label set where every existing label changes color, plus one new label
+        with open(export_file) as handle:
+            labels = json.load(handle)
+        seen, changed = set(), []
+        for label in labels:
+            if label['Name'] not in seen:
+                seen.add(label['Name'])
+                color = int(label['Color'].lstrip('#'), 16) ^ 1
+                changed.append(dict(Name=label['Name'], Color='{:06x}'.format(color)))
+        changed.append(dict(Name='benchmarked', Color='123456'))
+        with open(import_file, 'w') as handle:
+            json.dump(changed, handle)
+
+        self.measure('label_import_dry_run', 'label', 'import', '--dry-run', *(jobs + repo_args + [import_file]))
+        self.rounds, rounds = 1, self.rounds  # writes are not idempotent
+        try:
+            self.measure('label_import', 'label', 'import', *(jobs + repo_args + [import_file]))
+        finally:
+            self.rounds = rounds
+        return self.results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return a list of regressions of ``results`` against a ``baseline``, and print a comparison."""
+    regressions = []
+    for name, current in sorted(results['results'].items()):
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        ratio = current['seconds'] / before['seconds'] if before['seconds'] else 1.0
+        print('{:24s} {:8.3f}s {:8.3f}s {:+7.1%}   {:6d} {:6d} requests'.format(
+              name, before['seconds'], current['seconds'], ratio - 1,
+              before['total_requests'], current['total_requests']))
+        if ratio > 1 + tolerance:
+            regressions.append('{} got {:.0%} slower'.format(name, ratio - 1))
+        if current['total_requests'] > before['total_requests']:
+            regressions.append('{} needs {} more requests'.format(
+                               name, current['total_requests'] - before['total_requests']))
+    return regressions
+
+
+def main(argv=None):
+    """Benchmark 'gh' commands against a local fake GitHub server."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--repos', type=int, default=50, help="Number of repositories.")
+    parser.add_argument('--labels', type=int, default=30, help="Number of labels per repository.")
+    parser.add_argument('--latency', type=float, default=0.005, help="Seconds added to each request.")
+    parser.add_argument('--page-size', type=int, default=30, help="Default page size of listings.")
+    parser.add_argument('--no-graphql', action='store_true', default=False, help="Only serve the REST API.")
+    parser.add_argument('--jobs', type=int, default=4, help="Value for the '--jobs' option.")
+    parser.add_argument('--engine', default='threads', choices=('threads', 'asyncio'))
+    parser.add_argument('--rate', type=float, default=None,
+                        help="Client-side request rate limit (GH_API_RATE), default is the shipped pacing.")
+    parser.add_argument('--rounds', type=int, default=3, help="Repetitions of each (read-only) command.")
+    parser.add_argument('-o', '--output', default=None, help="JSON result file.")
+    parser.add_argument('--compare', metavar='BASELINE', default=None, help="JSON results to compare with.")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slow-down before reporting a regression.")
+    args = parser.parse_args(argv)
+
+    from gh_commander import __version__
+
+    server = FakeHub.generate(repos=args.repos, labels=args.labels, latency=args.latency,
+                              page_size=args.page_size, graphql=not args.no_graphql).start()
+    workdir = tempfile.mkdtemp(prefix='gh-bench-')
+    try:
+        bench = Bench(server, workdir, jobs=args.jobs, engine=args.engine, rounds=args.rounds, rate=args.rate)
+        results = dict(
+            version=__version__,
+            python=platform.python_version(),
+            platform=platform.platform(),
+            timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            params=dict((k, v) for k, v in vars(args).items() if k not in ('output', 'compare', 'tolerance')),
+            results=bench.run(sorted(server.repos)),
+        )
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, 'bench-{}.json'.format(time.strftime('%Y%m%d-%H%M%S')))
+    if not os.path.isdir(os.path.dirname(output) or '.'):
+        os.makedirs(os.path.dirname(output))
+    with open(output, 'w') as handle:
+        json.dump(results, handle, indent=2, sort_keys=True)
+    for name, result in sorted(results['results'].items()):
+        print('{:24s} {:8.3f}s {:6d} requests'.format(name, result['seconds'], result['total_requests']))
+    print('Results written to {}'.format(output))
+
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(results, json.load(handle), tolerance=args.tolerance)
+        for regression in regressions:
+            print('REGRESSION: ' + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
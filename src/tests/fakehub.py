@@ -0,0 +1,336 @@
+# *- coding: utf-8 -*-
+# pylint: disable=missing-docstring, bad-continuation, invalid-name
+""" A local stand-in for the GitHub API, for integration tests and benchmarks.
+
+    Serves the REST endpoints used by ``gh`` below ``/api/v3`` (like GitHub
+    Enterprise does), and the label query of ``github.batch_labels`` at
+    ``/api/graphql``. Latency, page sizes, rate limit headers, and the number
+    of repositories and labels are configurable, and all requests are counted.
+
+    Run it standalone via ``python src/tests/fakehub.py --help``.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import re
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import Counter
+
+try:
+    from urllib.parse import urlparse, parse_qs, unquote
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from urlparse import urlparse, parse_qs
+    from urllib import unquote
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+
+REST_PREFIX = '/api/v3'
+GRAPHQL_PATH = '/api/graphql'
+DEFAULT_LABELS = [('bug', 'fc2929'), ('duplicate', 'cccccc'), ('enhancement', '84b6eb'),
+                  ('help wanted', '159818'), ('invalid', 'e6e6e6'), ('question', 'cc317c'), ('wontfix', 'ffffff')]
+
+
+class FakeHub(ThreadingMixIn, HTTPServer):
+    """ The fake GitHub server.
+
+        ``repos`` maps ``owner/name`` to a dict of label names to colors.
+        Use ``start()`` and ``stop()`` to run it in a background thread,
+        and ``base_url`` for ``GH_API_BASE_URL``.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, repos=None, users=None, latency=0.0, page_size=30, rate_limit=5000,
+                 graphql=True, address=('127.0.0.1', 0)):
+        HTTPServer.__init__(self, address, FakeHubHandler)
+        self.repos = repos if repos is not None else {}
+        self.users = users if users is not None else {}
+        self.latency = latency
+        self.page_size = page_size
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        self.graphql = graphql
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @classmethod
+    def generate(cls, owner='bench', repos=10, labels=len(DEFAULT_LABELS), **kwargs):
+        """Create a server with ``repos`` repositories having ``labels`` labels each."""
+        names = [i for i, _ in DEFAULT_LABELS] + ['label-{:04d}'.format(i) for i in range(labels)]
+        colors = dict(DEFAULT_LABELS)
+        label_set = dict((i, colors.get(i, '{:06x}'.format(idx * 997 % 0xffffff))) for idx, i in enumerate(names[:labels]))
+        users = {owner: dict(login=owner, id=1, type='User', name='Bench Mark')}
+        return cls(dict(('{}/repo-{:04d}'.format(owner, i), dict(label_set)) for i in range(repos)),
+                   users=users, **kwargs)
+
+    @property
+    def base_url(self):
+        return 'http://user:pwd@{}:{}/'.format(*self.server_address)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, kind):
+        with self.lock:
+            self.requests[kind] += 1
+            self.remaining = max(self.remaining - 1, 0)
+            return self.remaining
+
+    def reset_counts(self):
+        with self.lock:
+            self.requests.clear()
+            self.remaining = self.rate_limit
+
+
+class FakeHubHandler(BaseHTTPRequestHandler):
+    """Request handler of ``FakeHub``."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    wbufsize = -1  # send headers and body in one go
+    payload = b''
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    # Helpers
+
+    def api_url(self, path):
+        return 'http://{}:{}{}{}'.format(self.server.server_address[0], self.server.server_address[1],
+                                         REST_PREFIX, path)
+
+    def label_json(self, repo, name, color):
+        return dict(name=name, color=color, url=self.api_url('/repos/{}/labels/{}'.format(repo, name)))
+
+    def body(self):
+        return json.loads(self.payload.decode('utf-8')) if self.payload else {}
+
+    def reply(self, status, data=None, kind='other', headers=None):
+        remaining = self.server.count(kind)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = b'' if data is None else json.dumps(data).encode('utf-8')
+        etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+        if status == 200 and self.command == 'GET' and self.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-RateLimit-Limit', str(self.server.rate_limit))
+        self.send_header('X-RateLimit-Remaining', str(remaining))
+        self.send_header('X-RateLimit-Reset', str(int(time.time()) + 3600))
+        if self.command == 'GET' and status in (200, 304):
+            self.send_header('ETag', etag)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+
+    def paginated(self, url, items, kind):
+        query = parse_qs(url.query)
+        per_page = min(int(query.get('per_page', [self.server.page_size])[0]), 100)
+        page = int(query.get('page', ['1'])[0])
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        links = []
+        base = self.api_url(url.path[len(REST_PREFIX):]) + '?per_page={}&page='.format(per_page)
+        if page < last:
+            links.append('<{}{}>; rel="next"'.format(base, page + 1))
+            links.append('<{}{}>; rel="last"'.format(base, last))
+        headers = {'Link': ', '.join(links)} if links else {}
+        self.reply(200, items[(page - 1) * per_page:page * per_page], kind=kind, headers=headers)
+
+    def not_found(self):
+        self.reply(404, dict(message='Not Found', documentation_url='https://developer.github.com/v3'))
+
+    # Request dispatch
+
+    def route(self):
+        # Always consume the request body, to keep persistent connections in sync
+        self.payload = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        url = urlparse(self.path)
+        if url.path == GRAPHQL_PATH and self.command == 'POST':
+            return self.do_graphql()
+        if not url.path.startswith(REST_PREFIX):
+            return self.not_found()
+
+        path = url.path[len(REST_PREFIX):]
+        for pattern, handler in ROUTES:
+            match = re.match(pattern + '$', path)
+            if match and handler.__name__.startswith(self.command.lower() + '_'):
+                return handler(self, url, *[unquote(i) for i in match.groups()])
+        return self.not_found()
+
+    do_GET = do_POST = do_PATCH = do_DELETE = route
+
+    def get_user(self, _, login):
+        if login not in self.server.users:
+            return self.not_found()
+        self.reply(200, self.server.users[login], kind='user')
+
+    def get_org(self, _, org):
+        if not any(i.startswith(org + '/') for i in self.server.repos):
+            return self.not_found()
+        self.reply(200, dict(login=org, id=2, type='Organization', url=self.api_url('/orgs/' + org)), kind='org')
+
+    def get_own_repos(self, url):
+        self.get_owner_repos(url, 'users', 'user')
+
+    def get_repo(self, _, repo):
+        if repo not in self.server.repos:
+            return self.not_found()
+        owner, name = repo.split('/')
+        self.reply(200, dict(name=name, full_name=repo, owner=dict(login=owner),
+                             url=self.api_url('/repos/' + repo)), kind='repo')
+
+    def get_owner_repos(self, url, _, owner):
+        if not any(i.startswith(owner + '/') for i in self.server.repos):
+            return self.not_found()
+        repos = [dict(name=i.split('/')[1], full_name=i, owner=dict(login=owner), url=self.api_url('/repos/' + i))
+                 for i in sorted(self.server.repos) if i.startswith(owner + '/')]
+        self.paginated(url, repos, kind='repos')
+
+    def get_labels(self, url, repo):
+        if repo not in self.server.repos:
+            return self.not_found()
+        labels = [self.label_json(repo, k, v) for k, v in sorted(self.server.repos[repo].items())]
+        self.paginated(url, labels, kind='labels')
+
+    def post_label(self, _, repo):
+        if repo not in self.server.repos:
+            return self.not_found()
+        data = self.body()
+        with self.server.lock:
+            self.server.repos[repo][data['name']] = data['color']
+        self.reply(201, self.label_json(repo, data['name'], data['color']), kind='write')
+
+    def patch_label(self, _, repo, name):
+        data = self.body()
+        with self.server.lock:
+            labels = self.server.repos.get(repo, {})
+            if name not in labels:
+                return self.not_found()
+            del labels[name]
+            labels[data.get('name', name)] = data['color']
+        self.reply(200, self.label_json(repo, data.get('name', name), data['color']), kind='write')
+
+    def delete_label(self, _, repo, name):
+        with self.server.lock:
+            labels = self.server.repos.get(repo, {})
+            if name not in labels:
+                return self.not_found()
+            del labels[name]
+        self.reply(204, kind='write')
+
+    def do_graphql(self):
+        if not self.server.graphql:
+            return self.not_found()
+        variables = self.body().get('variables') or {}
+        data, errors = {}, []
+        for key in variables:
+            if key.startswith('login'):
+                data['u' + key[5:]] = self.graphql_user(variables[key])
+                if data['u' + key[5:]] is None:
+                    errors.append(dict(type='NOT_FOUND', path=['u' + key[5:]],
+                                       message='Could not resolve ' + variables[key]))
+                continue
+            if not key.startswith('owner'):
+                continue
+            idx = key[5:]
+            repo = '{}/{}'.format(variables['owner' + idx], variables['name' + idx])
+            if repo not in self.server.repos:
+                data['r' + idx] = None
+                errors.append(dict(type='NOT_FOUND', path=['r' + idx], message='Could not resolve ' + repo))
+                continue
+            labels = sorted(self.server.repos[repo].items())
+            start = int(variables.get('after' + idx) or 0)
+            page = labels[start:start + 100]
+            data['r' + idx] = dict(labels=dict(
+                nodes=[dict(name=k, color=v) for k, v in page],
+                pageInfo=dict(hasNextPage=start + 100 < len(labels), endCursor=str(start + 100)),
+            ))
+        self.reply(200, dict(data=data, errors=errors) if errors else dict(data=data), kind='graphql')
+
+
+    def graphql_user(self, login):
+        user = self.server.users.get(login)
+        if user is None or user.get('type', 'User') != 'User':
+            return None
+        return dict(login=user['login'], name=user.get('name'), databaseId=user.get('id'), email=user.get('email'),
+                    location=user.get('location'), url=user.get('html_url'),
+                    createdAt=user.get('created_at'), updatedAt=user.get('updated_at'),
+                    repositories=dict(totalCount=user.get('public_repos', 0)),
+                    gists=dict(totalCount=user.get('public_gists', 0)),
+                    followers=dict(totalCount=user.get('followers', 0)),
+                    following=dict(totalCount=user.get('following', 0)))
+
+
+ROUTES = [
+    (r'/user/repos', FakeHubHandler.get_own_repos),
+    (r'/users/([^/]+)', FakeHubHandler.get_user),
+    (r'/orgs/([^/]+)', FakeHubHandler.get_org),
+    (r'/(users|orgs)/([^/]+)/repos', FakeHubHandler.get_owner_repos),
+    (r'/repos/([^/]+/[^/]+)', FakeHubHandler.get_repo),
+    (r'/repos/([^/]+/[^/]+)/labels', FakeHubHandler.get_labels),
+    (r'/repos/([^/]+/[^/]+)/labels', FakeHubHandler.post_label),
+    (r'/repos/([^/]+/[^/]+)/labels/([^/]+)', FakeHubHandler.patch_label),
+    (r'/repos/([^/]+/[^/]+)/labels/([^/]+)', FakeHubHandler.delete_label),
+]
+
+
+def main(argv=None):
+    """Run a fake GitHub server in the foreground."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--port', type=int, default=8042)
+    parser.add_argument('--repos', type=int, default=10)
+    parser.add_argument('--labels', type=int, default=len(DEFAULT_LABELS))
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to each request.")
+    parser.add_argument('--page-size', type=int, default=30)
+    parser.add_argument('--no-graphql', action='store_true', default=False)
+    args = parser.parse_args(argv)
+
+    server = FakeHub.generate(repos=args.repos, labels=args.labels, latency=args.latency,
+                              page_size=args.page_size, graphql=not args.no_graphql,
+                              address=('127.0.0.1', args.port))
+    print('export GH_API_BASE_URL={}'.format(server.base_url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print('\nRequests: {}'.format(dict(server.requests)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, missing-docstring, no-self-use, bad-continuation
+# pylint: disable=invalid-name, redefined-outer-name, unused-wildcard-import
+""" Test the benchmark suite and its fake GitHub server.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import pytest
+import requests
+
+from markers import *
+import benchmark
+from fakehub import FakeHub
+
+
+@pytest.fixture
+def hub(request):
+    server = FakeHub.generate(repos=3, labels=45).start()
+    request.addfinalizer(server.stop)
+    return server
+
+
+def test_fakehub_paginates_labels(hub):
+    url = 'http://{}:{}/api/v3/repos/bench/repo-0001/labels'.format(*hub.server_address)
+    first = requests.get(url)
+    second = requests.get(first.links['next']['url'])
+
+    assert len(first.json()) == 30 and len(second.json()) == 15
+    assert 'next' not in second.links
+    assert first.headers['X-RateLimit-Remaining'] == '4999'
+    assert hub.requests['labels'] == 2
+
+
+def test_fakehub_answers_graphql_label_batches(hub):
+    url = 'http://{}:{}/api/graphql'.format(*hub.server_address)
+    data = requests.post(url, json=dict(query='...', variables=dict(
+        owner0='bench', name0='repo-0000', after0=None, owner1='bench', name1='nope', after1=None))).json()
+
+    assert len(data['data']['r0']['labels']['nodes']) == 45
+    assert data['data']['r1'] is None and data['errors'][0]['type'] == 'NOT_FOUND'
+
+
+def test_benchmark_compare_reports_regressions():
+    baseline = dict(results=dict(label_list=dict(seconds=1.0, total_requests=10)))
+    current = dict(results=dict(label_list=dict(seconds=1.5, total_requests=12)))
+
+    assert benchmark.compare(current, baseline, tolerance=0.2) == [
+        'label_list got 50% slower', 'label_list needs 2 more requests']
+    assert benchmark.compare(baseline, baseline) == []
+
+
+@cli
+@integration
+def test_benchmark_runs_label_commands(hub, tmpdir):
+    results = benchmark.Bench(hub, str(tmpdir), jobs=2, rounds=1, rate=1000).run(sorted(hub.repos))
+
+    assert sorted(results) == ['label_export', 'label_import', 'label_import_dry_run', 'label_list', 'startup']
+    assert results['label_import']['requests']['write'] == 3 * 46, "All labels are changed, and one is added"
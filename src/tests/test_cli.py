@@ -22,6 +22,8 @@ from __future__ import absolute_import, unicode_literals, print_function
 
 import os
 import sys
+import time
+import subprocess
 
 import sh
 import pytest
@@ -34,6 +36,8 @@ from gh_commander import commands
 
 
 UsageError = sh.ErrorReturnCode_2  # pylint: disable=no-member
+HEAVY_MODULES = ('github3', 'tablib', 'requests')
+STARTUP_BUDGET = 1.5  # seconds for 'gh --help'
 
 
 @pytest.fixture
@@ -101,3 +105,31 @@ def test_cmd_help():
     assert 'configuration' in words
     assert any(i.endswith(os.sep + 'cli.conf') for i in words), \
            "Some '.conf' files listed in " + repr(words)
+
+
+@cli
+def test_cli_startup_does_not_import_heavy_modules():
+    script = ("import sys; from gh_commander import __main__; "
+              "print(' '.join(i for i in {!r} if i in sys.modules))".format(HEAVY_MODULES))
+    loaded = subprocess.check_output([sys.executable, '-c', script]).decode('ascii').split()
+
+    assert loaded == [], "Heavy modules are only imported by commands that need them"
+
+
+@cli
+def test_cmd_help_lists_lazy_commands():
+    runner = CliRunner()
+    result = runner.invoke(main.cli, args=('--help',))
+
+    assert result.exit_code == 0
+    assert 'Managing issue labels.' in result.output, "Short help of a lazy command is listed"
+
+
+@cli
+@integration
+def test_cli_startup_time_is_within_budget(cmd):
+    started = time.time()
+    cmd('--help')
+    elapsed = time.time() - started
+
+    assert elapsed < STARTUP_BUDGET, "'gh --help' took {:.2f} seconds".format(elapsed)
@@ -0,0 +1,117 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, missing-docstring, no-self-use, bad-continuation
+# pylint: disable=invalid-name, redefined-outer-name, unused-wildcard-import
+""" Test 'batch' command.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import io
+
+import pytest
+from bunch import Bunch
+from click.testing import CliRunner
+
+from markers import *
+from gh_commander import __main__ as main
+from gh_commander import github
+from gh_commander.commands import batch
+
+SCRIPT = """
+# Show some labels
+label list jhermann/waif
+gh label list 'jhermann/wiki'  # the command name is optional
+"""
+
+
+@pytest.fixture
+def apimock(monkeypatch):
+    """Mocked GitHub API, counting the repository lookups."""
+    calls = []
+    github.api.memo.__dict__.setdefault('conns', {})
+    github.api.memo.conns[None] = Bunch(
+        _calls = calls,
+        gh_config = Bunch(user='jhermann'),
+        graphql_supported = False,
+    )
+    monkeypatch.setattr(github, 'repo_handle', lambda api, user, repo: calls.append(repo) or Bunch(
+        labels = lambda: [Bunch(name='bug-in-' + repo, color='fc2929')],
+    ))
+    return github.api.memo.conns[None]
+
+
+def run_batch(script, *options):
+    return CliRunner().invoke(main.cli, ('--no-cache', 'batch') + options + ('-',), input=script)
+
+
+def test_script_lines_are_parsed_like_a_shell():
+    commands = batch.read_script(io.StringIO(SCRIPT))
+
+    assert commands == [(3, ['label', 'list', 'jhermann/waif']), (4, ['label', 'list', 'jhermann/wiki'])]
+
+
+@cli
+def test_commands_share_one_process(apimock):
+    result = run_batch(SCRIPT)
+
+    assert result.exit_code == 0, result.output
+    assert apimock._calls == ['waif', 'wiki']
+    assert result.output.index('bug-in-waif') < result.output.index('bug-in-wiki')
+
+
+@cli
+def test_batch_stops_at_first_failure(apimock):
+    result = run_batch('no-such-command\n' + SCRIPT)
+
+    assert result.exit_code != 0
+    assert 'Line 1 failed' in result.output
+    assert apimock._calls == []
+
+
+@cli
+def test_concurrent_batch_stops_at_first_failure(apimock):
+    result = run_batch('no-such-command\n' + ''.join('label list jhermann/repo{}\n'.format(i) for i in range(20)),
+                       '--parallel', '2')
+
+    assert result.exit_code != 0
+    assert 'Line 1 failed' in result.output
+    assert len(apimock._calls) < 4, "Queued commands are not run"
+
+
+@cli
+def test_batch_keeps_going_when_asked(apimock):
+    result = run_batch('no-such-command\n' + SCRIPT, '--keep-going')
+
+    assert result.exit_code != 0
+    assert '1 of 3 command(s) failed' in result.output
+    assert apimock._calls == ['waif', 'wiki']
+
+
+@cli
+def test_concurrent_commands_keep_output_order(apimock):
+    repos = ['repo{}'.format(i) for i in range(12)]
+    result = run_batch(''.join('label list jhermann/{}\n'.format(i) for i in repos), '--parallel', '4')
+
+    assert result.exit_code == 0, result.output
+    assert sorted(apimock._calls) == sorted(repos)
+    positions = [result.output.index('bug-in-{} '.format(i)) for i in repos]
+    assert positions == sorted(positions)
+
+
+@cli
+def test_batches_cannot_be_nested(apimock):
+    result = run_batch('batch other.txt\n')
+
+    assert 'cannot be nested' in result.output
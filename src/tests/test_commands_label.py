@@ -22,6 +22,8 @@
 from __future__ import absolute_import, unicode_literals, print_function
 
 import os
+import json
+import sqlite3
 
 import pytest
 import tablib
@@ -29,7 +31,7 @@ from bunch import Bunch
 from click.testing import CliRunner
 
 from markers import *
-from gh_commander import github
+from gh_commander import github, snapshots
 from gh_commander._compat import text_type
 from gh_commander.commands import label
 
@@ -45,18 +47,23 @@ MOCK_DATA = [
 
 
 @pytest.fixture
-def apimock():
-    """Mocked GitHub API."""
+def apimock(monkeypatch):
+    """Mocked GitHub API; its ``repo_handle`` and ``repo_listing`` stand in for the module functions."""
     recorder = []
     github.api.memo.__dict__.setdefault('conns', {})
     github.api.memo.conns[None] = Bunch(
         _recorder = recorder,
         gh_config = Bunch(user='jhermann'),
-        repository = lambda user, repo: Bunch(
+        graphql_supported = False,
+        repo_handle = lambda user, repo: Bunch(
             labels = lambda: MOCK_DATA,
             create_label = lambda *args: recorder.append(('create', args)) or True,
         ),
+        repo_listing = lambda kind, owner: iter(
+            Bunch(name=i, full_name='{}/{}'.format(owner, i)) for i in ('waif', 'wiki', 'other')),
     )
+    monkeypatch.setattr(github, 'repo_handle', lambda api, user, repo: api.repo_handle(user, repo))
+    monkeypatch.setattr(github, 'iter_repos', lambda api, kind, owner: api.repo_listing(kind, owner))
     return github.api.memo.conns[None]
 
 
@@ -76,6 +83,74 @@ def test_command_label_list_uses_the_mocked_data(tmpdir, apimock):
     assert '#123456' in result.output, "Mocked color appears in output"
 
 
+@cli
+def test_command_label_list_expands_org_selectors(apimock):
+    runner = CliRunner()
+    result = runner.invoke(label.label_list, ("org:jhermann/w*",))
+    headers = [line.split()[-1] for line in result.output.splitlines() if line.startswith('⎇')]
+
+    assert result.exit_code == 0, "Exit code OK for 'label list' with a selector"
+    assert headers == ['jhermann/waif', 'jhermann/wiki'], "Matching repos are listed in order"
+
+
+@cli
+def test_command_label_list_serves_fresh_snapshots(tmpdir, apimock):
+    runner = CliRunner()
+    apimock.gh_config.update(site='github.com', snapshot_file=str(tmpdir.join('snapshots.sqlite')))
+    runner.invoke(label.label_list, ("jhermann/waif",))
+    apimock.repo_handle = lambda user, repo: pytest.fail("Snapshot is not used")
+
+    result = runner.invoke(label.label_list, ("--max-age", "60", "jhermann/waif"))
+
+    assert result.exit_code == 0, "Exit code OK for 'label list' from a snapshot"
+    assert 'this-is-a-mocked-test' in result.output, "Snapshot name appears in output"
+
+
+#
+# 'label diff'
+#
+
+@cli
+def test_command_label_diff_compares_snapshots(tmpdir, apimock, monkeypatch):
+    path = str(tmpdir.join('snapshots.sqlite'))
+    with snapshots.SnapshotStore(github.GitHubConfig().site, path) as store:
+        store.put('jhermann', 'waif', [('bug', 'fc2929'), ('old', '000000'), ('same', '123456')])
+        store.put('jhermann', 'wiki', [('bug', 'ee0000'), ('new', '111111'), ('same', '123456')])
+    monkeypatch.setattr(github.GitHubConfig, 'SNAPSHOT_FILE', path)
+
+    runner = CliRunner()
+    result = runner.invoke(label.diff, ("jhermann/waif", "jhermann/w*"))
+    lines = result.output.splitlines()
+
+    assert result.exit_code == 0, "Exit code OK for 'label diff'"
+    assert lines[0].startswith('⎇   jhermann/wiki vs. jhermann/waif'), "Repos are compared to the first one"
+    assert lines[1:] == ['~    bug #fc2929 → #ee0000', '+    new #111111', '-    old #000000',
+                         'INFO 1 label(s) are the same.']
+
+
+@cli
+def test_command_label_diff_needs_owners_without_a_user(tmpdir, monkeypatch):
+    monkeypatch.setattr(github.GitHubConfig, 'SNAPSHOT_FILE', str(tmpdir.join('snapshots.sqlite')))
+    monkeypatch.setattr(github.GitHubConfig, '_get_auth', lambda self, config: setattr(self, 'user', None))
+
+    result = CliRunner().invoke(label.diff, ("jhermann/waif", "wiki"))
+
+    assert result.exit_code == 2
+    assert 'No owner given for repo "wiki"' in result.output
+
+
+def test_command_label_diff_reports_unreadable_snapshots(tmpdir, monkeypatch):
+    path = tmpdir.join('snapshots.sqlite')
+    path.write('This is no database')
+    monkeypatch.setattr(github.GitHubConfig, 'SNAPSHOT_FILE', str(path))
+
+    result = CliRunner().invoke(label.diff, ("jhermann/waif", "jhermann/wiki"))
+
+    assert result.exit_code == 2
+    assert 'Cannot read label snapshots' in result.output
+    assert not isinstance(result.exception, sqlite3.Error)
+
+
 #
 # 'label export'
 #
@@ -150,7 +225,10 @@ def test_command_label_import_takes_all_explicit_formats_correctly(tmpdir, apimo
 
         testfile = tmpdir.join("explicit-{}.dat".format(serializer))
         with testfile.open('wb') as handle:
-            text = getattr(tabdata, serializer)
+            if serializer == 'jsonl':
+                text = ''.join(json.dumps(i) + '\n' for i in tabdata.dict)
+            else:
+                text = getattr(tabdata, serializer)
             if isinstance(text, text_type):
                 text = text.encode('utf-8')
             handle.write(text)
@@ -166,7 +244,7 @@ def test_command_label_import_takes_all_explicit_formats_correctly(tmpdir, apimo
 @cli
 def test_command_label_import_reports_non_existing_repo(apimock):
     runner = CliRunner()
-    apimock.repository = lambda user, repo: None
+    apimock.repo_handle = lambda user, repo: None
 
     result = runner.invoke(label.label_import, ('--format', 'csv', "does-not/exist", "from", os.devnull))
     # print(result); print(vars(result)); print(result.output)
@@ -192,3 +270,170 @@ def test_command_label_import_creates_a_new_label_and_reports_unique_ones(tmpdir
     assert 'Created label "new-test-label" with color #123456' in result.output, "Added label is reported"
     assert 'Unique labels in this repo: duplicate, enhancement, this-is-a-mocked-test' in result.output, \
            "Unique label names are reported"
+
+
+@cli
+def test_command_label_import_with_jobs_reports_repos_in_order(tmpdir, apimock):
+    runner = CliRunner()
+
+    testfile = tmpdir.join("parallel.yaml")
+    with testfile.open('wb') as handle:
+        handle.write(b"- {Color: '#123456', Name: 'new-test-label'}")
+
+    repos = ["what/ever-{}".format(i) for i in range(8)]
+    result = runner.invoke(label.label_import, ['--jobs', '4'] + repos + ["from", str(testfile)])
+    headers = [line.split()[-1] for line in result.output.splitlines() if line.startswith('⎇')]
+
+    assert result.exit_code == 0, "Exit code OK for parallel import"
+    assert headers == repos, "Repos are reported in argument order"
+    assert len(apimock._recorder) == len(repos), "Label is added to every repo"
+    assert result.output.count('Created label "new-test-label"') == len(repos), "Added labels are reported"
+
+
+@cli
+def test_command_label_import_dry_run_only_shows_the_plan(tmpdir, apimock):
+    runner = CliRunner()
+
+    testfile = tmpdir.join("plan.yaml")
+    with testfile.open('wb') as handle:
+        handle.write(b"- {Color: '#123456', Name: 'new-test-label'}\n- {Color: '#cccccc', Name: 'duplicate'}")
+
+    result = runner.invoke(label.label_import, ("--dry-run", "what/ever", "from", str(testfile)))
+
+    assert result.exit_code == 0, "Exit code OK for dry run"
+    assert len(apimock._recorder) == 0, "Nothing is written"
+    assert 'PLAN Create label "new-test-label" with color #123456' in result.output, "Planned creation is reported"
+    assert '1 label(s) already up to date' in result.output, "Unchanged labels are counted"
+
+
+@cli
+def test_command_label_import_resumes_after_completed_repos(tmpdir, apimock):
+    runner = CliRunner()
+    apimock.gh_config.update(site='github.com', journal_dir=str(tmpdir.join('journals')))
+    testfile = tmpdir.join("resume.yaml")
+    with testfile.open('wb') as handle:
+        handle.write(b"- {Color: '#123456', Name: 'new-test-label'}")
+
+    # Simulate an earlier run that got interrupted during the second repo
+    repos = ["what/ever-{}".format(i) for i in range(3)]
+    journal = label.open_journal(apimock, repos, {'new-test-label': '123456'})
+    journal.record(repos[0], 'done')
+    journal.record(repos[1], 'started')
+    journal.close()
+
+    result = runner.invoke(label.label_import, ['--resume'] + repos + ["from", str(testfile)])
+    headers = [line.split()[-1] for line in result.output.splitlines() if line.startswith('⎇')]
+
+    assert result.exit_code == 0, "Exit code OK for resumed import"
+    assert 'Resuming import, 1 repo(s) already done' in result.output
+    assert 'Re-verifying "what/ever-1"' in result.output, "Interrupted repo is verified again"
+    assert headers == repos[1:], "Completed repo is skipped"
+    assert tmpdir.join('journals').listdir() == [], "Journal is removed after success"
+
+
+@cli
+def test_command_label_import_warns_about_unwritable_journal(tmpdir, apimock):
+    blocker = tmpdir.join('not-a-dir')
+    blocker.write('')
+    apimock.gh_config.update(site='github.com', journal_dir=str(blocker))
+    repos = ["what/ever"]
+
+    journal = label.open_journal(apimock, repos, {'new-test-label': '123456'})
+
+    assert journal is None, "Import proceeds without a journal"
+    with pytest.raises(label.dclick.LoggedFailure):
+        label.open_journal(apimock, repos, {'new-test-label': '123456'}, resume=True)
+
+
+#
+# Pruning and 'label delete'
+#
+
+def deletable_labels(apimock):
+    """Let the mocked repos return labels that record their deletion, and their listing."""
+    def labels(repo):
+        "Helper"
+        apimock._recorder.append(('list', repo))
+        return [Bunch(name=i.name, color=i.color,
+                      delete=lambda name=i.name: apimock._recorder.append(('delete', repo, name)) or True)
+                for i in MOCK_DATA]
+
+    apimock.repo_handle = lambda user, repo: Bunch(
+        labels=lambda: labels(repo),
+        create_label=lambda *args: apimock._recorder.append(('create', args)) or True,
+    )
+
+
+@cli
+def test_command_label_import_with_prune_deletes_unique_labels(tmpdir, apimock):
+    deletable_labels(apimock)
+    testfile = tmpdir.join("prune.yaml")
+    with testfile.open('wb') as handle:
+        handle.write(b"- {Color: '#cccccc', Name: 'duplicate'}")
+
+    result = CliRunner().invoke(label.label_import, ("--prune", "what/ever", "from", str(testfile)), input='y\n')
+
+    assert result.exit_code == 0
+    assert 'PLAN Delete label "enhancement" with color #84b6eb' in result.output
+    assert 'Delete 2 label(s) not in the import set?' in result.output
+    assert sorted(apimock._recorder) == [('delete', 'ever', 'enhancement'), ('delete', 'ever', 'this-is-a-mocked-test'),
+                                         ('list', 'ever')]
+    assert 'OK   Deleted label "enhancement" with color #84b6eb' in result.output
+    assert 'Unique labels' not in result.output
+
+
+@cli
+def test_command_label_import_with_prune_can_be_declined(tmpdir, apimock):
+    deletable_labels(apimock)
+    testfile = tmpdir.join("prune.yaml")
+    with testfile.open('wb') as handle:
+        handle.write(b"- {Color: '#cccccc', Name: 'duplicate'}")
+
+    result = CliRunner().invoke(label.label_import, ("--prune", "what/ever", "from", str(testfile)), input='n\n')
+
+    assert result.exit_code == 1, "Declined confirmation aborts"
+    assert apimock._recorder == [('list', 'ever')], "Nothing is deleted before confirmation"
+
+
+@cli
+def test_command_label_delete_plans_first_and_asks(apimock):
+    deletable_labels(apimock)
+    repos = ["what/ever-{}".format(i) for i in range(3)]
+
+    result = CliRunner().invoke(label.delete, ['-l', 'dup*', '-l', '~^enh'] + repos, input='n\n')
+
+    assert result.exit_code == 1, "Declined confirmation aborts"
+    assert result.output.count('PLAN Delete label "duplicate" with color #cccccc') == 3
+    assert result.output.count('PLAN Delete label') == 6
+    assert 'Delete 6 label(s)?' in result.output
+    assert all(i[0] == 'list' for i in apimock._recorder), "Nothing is deleted before confirmation"
+
+
+@cli
+def test_command_label_delete_with_yes_deletes_concurrently(apimock):
+    deletable_labels(apimock)
+    repos = ["what/ever-{}".format(i) for i in range(5)]
+
+    result = CliRunner().invoke(label.delete, ['--jobs', '3', '--yes', '-l', 'DUPLICATE'] + repos)
+    headers = [line.split()[-1] for line in result.output.splitlines() if line.startswith('⎇')]
+
+    assert result.exit_code == 0
+    assert headers == repos + repos, "Plan and results are reported in argument order"
+    assert sorted(i for i in apimock._recorder if i[0] == 'delete') == [
+        ('delete', i.split('/')[1], 'duplicate') for i in repos]
+    assert sorted(i for i in apimock._recorder if i[0] == 'list') == [
+        ('list', i.split('/')[1]) for i in repos], "The planned deletions are made without listing labels again"
+
+
+@cli
+def test_command_label_delete_dry_run_and_usage_errors(apimock):
+    deletable_labels(apimock)
+    runner = CliRunner()
+
+    result = runner.invoke(label.delete, ['--dry-run', '-l', 'nomatch', 'what/ever'])
+    assert result.exit_code == 0
+    assert 'INFO No changes.' in result.output
+
+    assert runner.invoke(label.delete, ['what/ever']).exit_code == 2, "Patterns are required"
+    assert runner.invoke(label.delete, ['-l', 'x']).exit_code == 2, "Repos are required"
+    assert apimock._recorder == [('list', 'ever')]
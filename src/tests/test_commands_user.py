@@ -0,0 +1,116 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, unused-wildcard-import, missing-docstring
+# pylint: disable=redefined-outer-name, no-self-use, bad-continuation
+# pylint: disable=unused-argument, bad-whitespace, invalid-name, protected-access
+""" Test 'user' command.
+
+    See http://click.pocoo.org/3/testing/
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+from __future__ import absolute_import, unicode_literals, print_function
+
+import json
+import time
+import random
+
+import pytest
+from bunch import Bunch
+from click.testing import CliRunner
+
+from markers import *
+from gh_commander import github
+from gh_commander._compat import BytesIO
+from gh_commander.commands import user
+
+#
+# Helpers
+#
+
+def mock_user(login):
+    time.sleep(random.random() / 100)  # complete out of order
+    if login in ('nobody', 'acme'):
+        return None
+    return Bunch(as_dict=lambda: dict(login=login, name=login.title(), type='User', id=1,
+                                      created_at='2015-01-01', updated_at='2015-01-02', html_url='',
+                                      public_repos=1, public_gists=0, followers=0, following=0))
+
+
+@pytest.fixture
+def apimock():
+    """Mocked GitHub API."""
+    github.api.memo.__dict__.setdefault('conns', {})
+    github.api.memo.conns[None] = Bunch(gh_config=Bunch(user='jhermann'), graphql_supported=False, user=mock_user)
+    return github.api.memo.conns[None]
+
+
+#
+# 'user show'
+#
+
+@cli
+def test_command_user_show_keeps_input_order(tmpdir, apimock):
+    roster = tmpdir.join('roster.txt')
+    roster.write('# accounts to audit\nuser-3\n\nnobody  # left\n' + ''.join('user-{}\n'.format(i) for i in range(9)))
+    result = CliRunner().invoke(user.user_show, ('--jobs', '4', 'first', '--from-file', str(roster)))
+
+    assert result.exit_code == 0
+    accounts = [i.split('[')[1].split(' ')[0] for i in result.output.splitlines() if i.startswith('ACCOUNT')]
+    assert accounts == ['first', 'user-3'] + ['user-{}'.format(i) for i in range(9)]
+    assert "Unknown user 'nobody'" in result.output
+
+
+@cli
+def test_fetch_users_with_graphql_checks_unknown_users_via_rest(apimock):
+    def batch_users(api, logins, jobs):
+        "Helper"
+        batches.append(logins)
+        return dict((i, None if i in ('acme', 'nobody') else dict(login=i, source='graphql')) for i in logins)
+
+    batches = []
+    batch_users_orig, github.batch_users = github.batch_users, batch_users
+    try:
+        users = list(user.fetch_users(apimock, ['b', 'acme', 'a', 'b', 'nobody'], jobs=2, graphql=True))
+    finally:
+        github.batch_users = batch_users_orig
+
+    assert batches == [['a', 'acme', 'b', 'nobody']]
+    assert [i[0] for i in users] == ['b', 'acme', 'a', 'b', 'nobody']
+    assert users[0][1]['source'] == 'graphql'
+    assert users[1][1] is None and users[4][1] is None, "REST fallback did not find them either"
+
+
+@cli
+def test_fetch_users_without_graphql_falls_back_to_rest(apimock):
+    apimock.graphql_supported = False
+    users = list(user.fetch_users(apimock, ['b', 'a'], jobs=2, graphql=True))
+
+    assert [(i[0], i[1]['name']) for i in users] == [('b', 'B'), ('a', 'A')]
+
+
+@cli
+def test_command_user_show_streams_json_lines(apimock):
+    result = CliRunner().invoke(user.user_show, ('--format', 'jsonl', 'b', 'nobody', 'a'))
+
+    assert result.exit_code == 0
+    records = [json.loads(i) for i in result.output.splitlines() if i.startswith('{')]
+    assert [(i['login'], i['name'], i['public_repos']) for i in records] == [('b', 'B', 1), ('a', 'A', 1)]
+    assert list(records[0]) == list(user.USER_FIELDS)
+
+
+@cli
+def test_write_users_as_csv():
+    stream = BytesIO()
+    user.write_users([('a', dict(login='a', id=1, name='Ä')), ('x', None)], 'csv', stream=stream)
+
+    lines = stream.getvalue().decode('utf-8').splitlines()
+    assert lines[0].startswith('login,id,type,name,')
+    assert lines[1].startswith('a,1,,Ä,')
+    assert len(lines) == 2
@@ -0,0 +1,122 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, missing-docstring, no-self-use, bad-continuation
+# pylint: disable=invalid-name, redefined-outer-name
+""" Test 'daemon' module.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import io
+import os
+import socket
+import threading
+from io import BytesIO
+
+import pytest
+
+from gh_commander import __main__ as main  # noqa pylint: disable=unused-import
+from gh_commander import daemon
+
+
+@pytest.fixture
+def server(tmpdir):
+    """A daemon serving in a background thread."""
+    daemon_server = daemon.DaemonServer(str(tmpdir.join('run', 'gh.sock')))
+    thread = threading.Thread(target=daemon_server.serve)
+    thread.start()
+    yield daemon_server
+    if not daemon_server.stopped:
+        daemon.control(daemon.SHUTDOWN, daemon_server.path)
+    thread.join()
+
+
+def forward(server, argv, stdin=b''):
+    out, err = BytesIO(), BytesIO()
+    code = daemon.forward(argv, server.path, stdin=BytesIO(stdin), stdout=out, stderr=err)
+    return code, out.getvalue().decode('utf-8'), err.getvalue().decode('utf-8')
+
+
+def test_frames_are_received_as_sent():
+    left, right = socket.socketpair()
+    daemon.send_frame(left, daemon.STDOUT, b'x' * 100000)
+    daemon.send_frame(left, daemon.EXIT, b'0')
+    left.close()
+
+    assert daemon.recv_frame(right) == (daemon.STDOUT, b'x' * 100000)
+    assert daemon.recv_frame(right) == (daemon.EXIT, b'0')
+    assert daemon.recv_frame(right) == (None, None)
+    right.close()
+
+
+def test_input_is_read_on_demand():
+    left, right = socket.socketpair()
+
+    def client():
+        "Helper"
+        for data in (b'y\n', b''):
+            channel, _ = daemon.recv_frame(right)
+            daemon.send_frame(right, daemon.STDIN if channel == daemon.INPUT else daemon.EXIT, data)
+
+    thread = threading.Thread(target=client)
+    thread.start()
+    stdin = io.BufferedReader(daemon.FrameReader(left), buffer_size=daemon.CHUNK_SIZE)
+    assert stdin.readline() == b'y\n', "A prompt gets the line typed by the user"
+    assert stdin.read() == b'', "An empty frame is the end of input"
+    assert stdin.read() == b'', "The client is not asked again after EOF"
+    thread.join()
+    left.close()
+    right.close()
+
+
+def test_socket_is_private(server):
+    assert os.stat(server.path).st_mode & 0o077 == 0
+
+
+def test_output_and_exit_code_are_forwarded(server):
+    code, out, _ = forward(server, ['--help'])
+    assert code == 0
+    assert out.startswith('Usage: gh ')
+
+    code, _, err = forward(server, ['no-such-command'])
+    assert code == 2
+    assert 'No such command' in err
+
+
+def test_stdin_is_forwarded(server):
+    code, out, _ = forward(server, ['batch', '-'], stdin=b'label --help\n')
+    assert code == 0
+    assert 'Usage: gh label ' in out
+
+
+def test_daemon_cannot_be_controlled_from_within(server):
+    code, _, err = forward(server, ['daemon', 'stop'])
+
+    assert code == 2
+    assert 'gh-client' in err
+    assert not server.stopped
+
+
+def test_status_and_shutdown(server):
+    forward(server, ['--help'])
+    status = daemon.control(daemon.STATUS, server.path)
+    assert status['pid'] == os.getpid()
+    assert status['requests'] == 1
+
+    daemon.control(daemon.SHUTDOWN, server.path)
+    assert server.stopped
+
+
+def test_forward_without_daemon(tmpdir):
+    assert daemon.forward(['--help'], str(tmpdir.join('none.sock'))) is None
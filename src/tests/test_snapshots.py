@@ -0,0 +1,80 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, missing-docstring, no-self-use, bad-continuation
+# pylint: disable=invalid-name, redefined-outer-name
+""" Test 'snapshots' module.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import time
+
+import pytest
+
+from gh_commander import snapshots
+
+
+@pytest.fixture
+def store(request, tmpdir):
+    store = snapshots.SnapshotStore('github.com', str(tmpdir.join('sub', 'snapshots.sqlite')))
+    request.addfinalizer(store.close)
+    return store
+
+
+def test_snapshot_store_records_labels(store):
+    store.put('jhermann', 'waif', [('wontfix', '#ffffff'), ('bug', 'fc2929')], etag='"abc"')
+    snapshot = store.get('jhermann', 'waif')
+
+    assert snapshot.labels == [('bug', 'fc2929'), ('wontfix', 'ffffff')], "Labels are sorted, without '#'"
+    assert snapshot.etag == '"abc"'
+    assert store.names() == ['jhermann/waif']
+
+
+def test_snapshot_store_replaces_and_drops_snapshots(store):
+    store.put('jhermann', 'waif', [('bug', 'fc2929')])
+    store.put('jhermann', 'waif', [('question', 'cc317c')])
+
+    assert [i.name for i in store.get('jhermann', 'waif').labels] == ['question']
+    store.drop('jhermann', 'waif')
+    assert store.get('jhermann', 'waif') is None
+
+
+def test_snapshot_store_ignores_old_snapshots(store):
+    store.put('jhermann', 'waif', [('bug', 'fc2929')], fetched=time.time() - 100)
+
+    assert store.get('jhermann', 'waif', max_age=60) is None
+    assert store.get('jhermann', 'waif', max_age=600) is not None
+
+
+def test_snapshot_store_separates_sites(store):
+    store.put('jhermann', 'waif', [('bug', 'fc2929')])
+    other = snapshots.SnapshotStore('github.example.com', store.path)
+
+    assert other.get('jhermann', 'waif') is None
+    other.close()
+
+
+def test_snapshot_stores_can_write_while_another_one_reads(store, monkeypatch):
+    monkeypatch.setattr(snapshots.SnapshotStore, 'TIMEOUT', 0.1)
+    store.put('jhermann', 'waif', [('bug', 'fc2929')])
+    store.put('jhermann', 'wiki', [('bug', 'fc2929')])
+    reading = store.db.execute('SELECT owner, repo FROM repos')
+    reading.fetchone()  # keeps the read transaction open
+
+    with snapshots.SnapshotStore('github.com', store.path) as other:
+        other.put('jhermann', 'gh-commander', [('bug', 'fc2929')])
+        other.drop('jhermann', 'waif')
+    reading.close()
+
+    assert store.names() == ['jhermann/gh-commander', 'jhermann/wiki']
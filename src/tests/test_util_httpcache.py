@@ -0,0 +1,113 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, missing-docstring, no-self-use, bad-continuation
+# pylint: disable=invalid-name, redefined-outer-name
+""" Test 'util.httpcache' module.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import io
+import os
+import time
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from gh_commander.util import httpcache
+
+URL = 'https://api.example.com/repos/jhermann/waif/labels'
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Replace the network layer by a canned server with an ETag."""
+    calls = []
+
+    def send(_, request, **kwargs):
+        calls.append(dict(request.headers))
+        response = Response()
+        response.url = request.url
+        response.request = request
+        if request.headers.get('If-None-Match') == '"v1"':
+            response.status_code = 304
+            response.headers = CaseInsensitiveDict({'X-RateLimit-Remaining': str(5000 - len(calls))})
+            response._content = b''
+        else:
+            response.status_code = 200
+            response.headers = CaseInsensitiveDict({'ETag': '"v1"', 'Content-Type': 'application/json'})
+            response._content = b'[{"name": "bug"}]'
+        response.raw = io.BytesIO(response._content)
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, 'send', send)
+    return calls
+
+
+@pytest.fixture
+def session(tmpdir):
+    session = requests.Session()
+    session.adapter = httpcache.install(session, str(tmpdir.join('cache')))
+    return session
+
+
+def test_http_cache_revalidates_with_etag(server, session):
+    first = session.get(URL)
+    second = session.get(URL)
+
+    assert len(server) == 2, "Both requests hit the network"
+    assert 'If-None-Match' not in server[0], "First request is unconditional"
+    assert server[1]['If-None-Match'] == '"v1"', "Second request is conditional"
+    assert not first.from_cache and second.from_cache
+    assert second.status_code == 200, "A 304 is served as the cached 200"
+    assert second.json() == [{'name': 'bug'}], "Cached body is returned"
+    assert second.headers['X-RateLimit-Remaining'] == '4998', "Fresh headers of the 304 are merged"
+
+
+def test_http_cache_with_ttl_avoids_the_network(server, session):
+    session.adapter.ttl = 60
+    session.get(URL)
+    response = session.get(URL)
+
+    assert len(server) == 1, "Fresh entry is served without a request"
+    assert response.from_cache
+
+
+def test_http_cache_key_depends_on_auth_identity(server, session):
+    session.get(URL, headers={'Authorization': 'token one'})
+    session.get(URL, headers={'Authorization': 'token two'})
+
+    assert 'If-None-Match' not in server[1], "Other credentials do not share entries"
+
+
+def test_http_cache_evicts_least_recently_used_entries(tmpdir):
+    cache = httpcache.HTTPCache(str(tmpdir), max_size=3000)
+    for idx in range(5):
+        cache.put('{:02d}'.format(idx) * 32, dict(body='x' * 900))
+        os.utime(cache._filename('{:02d}'.format(idx) * 32), (time.time() - 10 + idx, time.time() - 10 + idx))
+
+    assert cache.get('00' * 32) is None, "Oldest entry is evicted"
+    assert cache.get('04' * 32) is not None, "Newest entry is kept"
+
+
+def test_http_cache_size_is_kept_when_entries_are_replaced(tmpdir):
+    cache = httpcache.HTTPCache(str(tmpdir), max_size=100000)
+    cache.put('00' * 32, dict(body='x'))
+    for _ in range(10):
+        cache.put('01' * 32, dict(body='x' * 900))
+
+    assert cache._size == sum(os.path.getsize(i) for _, i in cache._entries()), "Replaced entries are not counted"
@@ -0,0 +1,62 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, missing-docstring, no-self-use, bad-continuation
+# pylint: disable=invalid-name, redefined-outer-name
+""" Test 'util.journal' module.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+from gh_commander.util import journal
+
+HEADER = dict(command='test', items=['a', 'b', 'c'])
+
+
+def test_journal_resumes_recorded_states(tmpdir):
+    path = str(tmpdir.join('journals', 'test.jsonl'))
+    first = journal.Journal(path, HEADER)
+    first.record('a', journal.STARTED, plan=[1, 2])
+    first.record('a', journal.DONE)
+    first.record('b', journal.STARTED)
+    first.close()
+    with open(path, 'a') as handle:
+        handle.write('{"key": "c", "sta')  # interrupted while writing
+
+    second = journal.Journal(path, HEADER, resume=True)
+    assert second.resumed
+    assert second.keys(journal.DONE) == set(['a'])
+    assert second.keys(journal.STARTED) == set(['b'])
+    second.remove()
+    assert not tmpdir.join('journals', 'test.jsonl').exists()
+
+
+def test_journal_for_other_operation_is_not_resumed(tmpdir):
+    path = str(tmpdir.join('test.jsonl'))
+    journal.Journal(path, HEADER).record('a', journal.DONE)
+
+    other = journal.Journal(path, dict(HEADER, items=['x']), resume=True)
+    assert not other.resumed and other.states == {}
+    other.close()
+
+
+def test_journal_without_resume_starts_afresh(tmpdir):
+    path = str(tmpdir.join('test.jsonl'))
+    journal.Journal(path, HEADER).record('a', journal.DONE)
+
+    assert journal.Journal(path, HEADER).keys(journal.DONE) == set()
+
+
+def test_journal_key_depends_on_header():
+    assert journal.journal_key(HEADER) == journal.journal_key(dict(HEADER))
+    assert journal.journal_key(HEADER) != journal.journal_key(dict(HEADER, command='other'))
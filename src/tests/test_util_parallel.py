@@ -0,0 +1,121 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, missing-docstring, no-self-use, bad-continuation
+# pylint: disable=invalid-name
+""" Test 'util.parallel' module.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import time
+import random
+import threading
+
+import pytest
+
+from gh_commander.util import parallel
+
+
+def slow_square(value):
+    time.sleep(random.random() / 100.0)
+    return value * value, threading.current_thread().name
+
+
+def test_ordered_map_keeps_input_order():
+    results = [i for i, _ in parallel.ordered_map(slow_square, range(20), jobs=8)]
+    assert results == [i * i for i in range(20)]
+
+
+def test_ordered_map_uses_worker_threads():
+    threads = set(name for _, name in parallel.ordered_map(slow_square, range(20), jobs=4))
+    assert threading.current_thread().name not in threads
+
+
+def test_ordered_map_with_one_job_runs_inline():
+    threads = set(name for _, name in parallel.ordered_map(slow_square, range(5), jobs=1))
+    assert threads == set([threading.current_thread().name])
+
+
+def test_ordered_map_accepts_a_shared_executor():
+    with parallel.pool(3) as executor:
+        first = list(parallel.ordered_map(slow_square, range(5), jobs=3, executor=executor))
+        second = list(parallel.ordered_map(slow_square, range(5, 10), jobs=3, executor=executor))
+    assert [i for i, _ in first + second] == [i * i for i in range(10)]
+
+
+def test_ordered_map_consumes_lazy_iterables():
+    consumed = []
+
+    def stream():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    results = parallel.ordered_map(slow_square, stream(), jobs=2)
+    next(results)
+    assert len(consumed) < 100, "Input is not read eagerly"
+    assert len(list(results)) == 99
+
+
+def test_ordered_map_cancels_queued_calls_when_closed():
+    calls = []
+    release = threading.Event()
+
+    def work(value):
+        calls.append(value)
+        if value:
+            release.wait(5)
+        return value
+
+    with parallel.pool(2) as executor:
+        results = parallel.ordered_map(work, range(100), jobs=2, executor=executor)
+        assert next(results) == 0
+        results.close()
+        release.set()
+    assert max(calls) < 3, "Calls waiting for a worker are cancelled"
+
+
+def test_chunked_splits_a_stream():
+    assert list(parallel.chunked(iter(range(7)), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(parallel.chunked([], 3)) == []
+
+
+def test_readahead_stops_the_producer_when_closed():
+    produced = []
+
+    def stream():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    threads = threading.active_count()
+    items = parallel.readahead(stream(), size=2)
+    assert next(items) == 0
+    items.close()
+    time.sleep(0.3)
+    assert threading.active_count() == threads, "The producer thread ends"
+    assert len(produced) < 10, "The rest of the input is not read"
+
+
+def test_readahead_keeps_order_and_reraises_errors():
+    def stream():
+        for i in range(5):
+            yield i
+        raise KeyError('boom')
+
+    results = []
+    with pytest.raises(KeyError):
+        for item in parallel.readahead(stream(), size=2):
+            results.append(item)
+    assert results == list(range(5)), "All items before the error are delivered in order"
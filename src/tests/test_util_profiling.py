@@ -0,0 +1,85 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, missing-docstring, no-self-use, bad-continuation
+# pylint: disable=invalid-name, redefined-outer-name
+""" Test 'util.profiling' module.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import json
+from datetime import timedelta
+
+from bunch import Bunch
+
+from gh_commander.util import profiling
+
+
+def test_endpoints_are_templated():
+    assert profiling.endpoint('GET', 'https://api.github.com/repos/a/b/labels?per_page=100') == \
+           'GET /repos/{owner}/{repo}/labels'
+    assert profiling.endpoint('PATCH', 'https://ghe.example.com/api/v3/repos/a/b/labels/to%20do') == \
+           'PATCH /repos/{owner}/{repo}/labels/{name}'
+    assert profiling.endpoint('GET', 'https://api.github.com/orgs/acme/repos') == 'GET /orgs/{login}/repos'
+    assert profiling.endpoint('POST', 'https://ghe.example.com/api/graphql') == 'POST /graphql'
+    assert profiling.endpoint('GET', 'https://api.github.com/') == 'GET /'
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert profiling.percentile(values, 0.5) == 50
+    assert profiling.percentile(values, 0.95) == 95
+    assert profiling.percentile([7], 0.95) == 7
+    assert profiling.percentile([], 0.5) == 0.0
+
+
+def test_profile_summarizes_calls(tmpdir):
+    profile = profiling.RequestProfile()
+    for idx in range(10):
+        profile.record('GET', 'https://api.github.com/repos/a/r{}/labels'.format(idx), 200, 0.01 * (idx + 1),
+                       received=100, headers={'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': str(4990 - idx)})
+    profile.record('GET', 'https://api.github.com/repos/a/r0/labels', 200, 0.001, received=100, from_cache=True)
+    profile.record('POST', 'https://api.github.com/repos/a/r0/labels', 201, 0.2, sent=40)
+    profile.retries['status 502'] += 1
+
+    summary = profile.summary()
+    labels = summary['endpoints']['GET /repos/{owner}/{repo}/labels']
+    assert list(summary['endpoints']) == ['GET /repos/{owner}/{repo}/labels', 'POST /repos/{owner}/{repo}/labels']
+    assert (labels['count'], labels['cached'], labels['received']) == (11, 1, 1100)
+    assert (labels['p50'], labels['p95'], labels['max']) == (0.05, 0.1, 0.1)
+    assert summary['requests'] == 12
+    assert summary['rate_limit'] == dict(limit=5000, used=10, remaining=4981)
+    assert summary['retries'] == {'status 502': 1}
+
+    report = profile.report()
+    assert report[1].startswith('GET /repos/{owner}/{repo}/labels')
+    assert 'Rate limit: 10 call(s) used, 4981 of 5000 remaining' in report
+    assert 'Retries: 1× status 502' in report
+
+    filename = str(tmpdir.join('profile.json'))
+    profile.dump(filename)
+    with open(filename) as handle:
+        assert json.load(handle)['requests'] == 12
+
+
+def test_profile_hook_records_responses():
+    profile = profiling.RequestProfile()
+    response = Bunch(
+        request=Bunch(method='PATCH', url='https://api.github.com/repos/a/b/labels/bug', body=b'{"color": "123456"}'),
+        status_code=200, headers={'Content-Length': '42'}, content=b'', elapsed=timedelta(seconds=0.25),
+    )
+
+    assert profile.hook(response) is response
+    stats = profile.summary()['endpoints']['PATCH /repos/{owner}/{repo}/labels/{name}']
+    assert (stats['count'], stats['sent'], stats['received'], stats['max']) == (1, 19, 42, 0.25)
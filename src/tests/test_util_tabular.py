@@ -0,0 +1,89 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, missing-docstring, no-self-use, bad-continuation
+# pylint: disable=invalid-name, redefined-outer-name
+""" Test 'util.tabular' module.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+import io
+import json
+
+import pytest
+import tablib
+
+from gh_commander.util import tabular
+
+HEADERS = ('Name', 'Color')
+BATCHES = [[('bug', '#fc2929'), ('größer', '#84b6eb')], [], [('wontfix', '#ffffff')]]
+
+
+def write(serializer, batches=BATCHES):
+    stream = io.BytesIO()
+    with tabular.writer(serializer, stream, HEADERS) as writer:
+        for rows in batches:
+            writer.write_rows(rows)
+    return stream.getvalue().decode('utf-8')
+
+
+@pytest.mark.parametrize('serializer', ['csv', 'tsv', 'json'])
+def test_streaming_writer_matches_tablib(serializer):
+    tabdata = tablib.Dataset(headers=HEADERS)
+    for rows in BATCHES:
+        tabdata.extend(rows)
+    expected = getattr(tabdata, serializer) + ('\n' if serializer == 'json' else '')
+
+    assert write(serializer) == expected
+
+
+def test_jsonl_writer_emits_one_object_per_line():
+    lines = write('jsonl').splitlines()
+
+    assert len(lines) == 3
+    assert json.loads(lines[1]) == dict(Name='größer', Color='#84b6eb')
+
+
+def test_yaml_writer_uses_flow_style():
+    text = write('yaml')
+
+    assert text.startswith("- {Color: '#fc2929', Name: bug}\n")
+    assert len(text.splitlines()) == 3
+
+
+@pytest.mark.parametrize('serializer, expected', [
+    ('csv', 'Name,Color\r\n'),
+    ('tsv', 'Name\tColor\r\n'),
+    ('json', '[]\n'),
+    ('jsonl', ''),
+    ('yaml', '[]\n'),
+])
+def test_writers_without_rows(serializer, expected):
+    assert write(serializer, []) == expected
+    assert write(serializer, [[]]) == expected, "Empty batches write nothing"
+
+
+def test_json_stays_well_formed_after_an_error():
+    stream = io.BytesIO()
+    with pytest.raises(KeyError):
+        with tabular.writer('json', stream, HEADERS) as writer:
+            writer.write_rows(BATCHES[0])
+            raise KeyError('boom')
+
+    assert [i['Name'] for i in json.loads(stream.getvalue().decode('utf-8'))] == ['bug', 'größer']
+
+
+def test_writers_implement_formatting():
+    with pytest.raises(TypeError):
+        tabular.RowWriter(io.BytesIO(), HEADERS)  # pylint: disable=abstract-class-instantiated
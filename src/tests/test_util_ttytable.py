@@ -0,0 +1,66 @@
+# *- coding: utf-8 -*-
+# pylint: disable=wildcard-import, missing-docstring, no-self-use, bad-continuation
+# pylint: disable=invalid-name, redefined-outer-name
+""" Test 'util.ttytable' module.
+"""
+# Copyright ©  2015 Jürgen Hermann <jh@web.de>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import, unicode_literals, print_function
+
+from gh_commander.util import ttytable
+
+HEADERS = ('Name', 'Color')
+
+
+def test_table_has_box_and_aligned_columns():
+    lines = list(ttytable.table_lines(HEADERS, [('bug', '#fc2929'), ('enhancement', '#84b6eb')]))
+
+    assert lines == [
+        '┌─────────────┬─────────┐',
+        '│ Name        │ Color   │',
+        '├─────────────┼─────────┤',
+        '│ bug         │ #fc2929 │',
+        '│ enhancement │ #84b6eb │',
+        '└─────────────┴─────────┘',
+    ]
+
+
+def test_rows_are_read_lazily():
+    consumed = []
+
+    def rows():
+        for idx in range(1000):
+            consumed.append(idx)
+            yield ('label-{}'.format(idx), '#000000')
+
+    lines = ttytable.table_lines(HEADERS, rows(), lookahead=10)
+    assert [next(lines) for _ in range(4)][-1] == '│ label-0 │ #000000 │'
+    assert len(consumed) == 10
+
+    assert '│ label-… │ #000000 │' in list(lines), "Cells wider than the lookahead rows are truncated"
+    assert len(consumed) == 1000
+
+
+def test_table_is_fitted_to_width():
+    lines = list(ttytable.table_lines(HEADERS, [('a-very-long-label-name', '#123456')], max_width=24))
+
+    assert all(ttytable.text_width(i) <= 24 for i in lines)
+    assert lines[3] == '│ a-very-lo… │ #123456 │'
+
+
+def test_wide_characters_take_two_cells():
+    lines = list(ttytable.table_lines(HEADERS, [('バグ bug', '#fc2929'), ('日本', '#000000')]))
+
+    assert len(set(ttytable.text_width(i) for i in lines)) == 1
+    assert ttytable.truncate('日本語', 4) == '日…'
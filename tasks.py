@@ -73,3 +73,21 @@ def ci(ctx):  # pylint: disable=invalid-name
     ctx.run("invoke --echo --pty clean --all build --docs check --reports{}".format(' '.join(opts)))
 
 namespace.add_task(ci)
+
+
+@task(
+    help={
+        'repos': "number of fake repositories",
+        'labels': "number of labels per repository",
+        'latency': "seconds added to each request",
+        'compare': "JSON results of an earlier run to compare with",
+    },
+)
+def bench(ctx, repos=50, labels=30, latency=0.005, compare=''):
+    """Benchmark commands against a local fake GitHub server."""
+    opts = ['--repos', str(repos), '--labels', str(labels), '--latency', str(latency)]
+    if compare:
+        opts += ['--compare', compare]
+    ctx.run("python src/tests/benchmark.py {}".format(' '.join(opts)))
+
+namespace.add_task(bench)